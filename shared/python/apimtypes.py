@@ -7,6 +7,7 @@ import json
 import os
 from dataclasses import dataclass
 from enum import IntEnum, StrEnum
+from functools import cached_property
 from pathlib import Path
 from typing import Any, List, Optional
 
@@ -383,24 +384,45 @@ class Output:
     def __init__(self, success: bool, text: str):
         """
         Initialize the Output object with command success status and output text.
-        Attempts to parse JSON from the output text.
+        JSON is parsed from the output text on first access to `json_data`, `is_json`, or `jsonParseException`.
         """
         self.success = success
         self.text = text
+
+    # ------------------------------
+    #    PROPERTIES
+    # ------------------------------
+
+    @cached_property
+    def json_data(self) -> Any:
+        """The JSON parsed from the output text (or from the first JSON substring in it), or None."""
+
         self.jsonParseException = None
 
         # Check if the exact string is JSON.
-        if is_string_json(text):
+        if is_string_json(self.text):
             try:
-                self.json_data = json.loads(text)
+                return json.loads(self.text)
             except json.JSONDecodeError as e:
                 self.jsonParseException = e
-                self.json_data = extract_json(text)
-        else:
-            # Check if a substring in the string is JSON.
-            self.json_data = extract_json(text)
+                return extract_json(self.text)
+
+        # Check if a substring in the string is JSON.
+        return extract_json(self.text)
+
+    @cached_property
+    def is_json(self) -> bool:
+        """Whether JSON could be parsed from the output text."""
+
+        return self.json_data is not None
+
+    @cached_property
+    def jsonParseException(self) -> json.JSONDecodeError | None:
+        """The error from parsing the whole output text as strict JSON, if that failed."""
 
-        self.is_json = self.json_data is not None
+        # Parsing json_data records the exception on the instance; it is None when json_data was assigned directly.
+        _ = self.json_data
+        return self.__dict__.get('jsonParseException')
 
     def get(self, key: str, label: str = '', secure: bool = False, suppress_logging: bool = False) -> str | None:
         """
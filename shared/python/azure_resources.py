@@ -5,12 +5,13 @@ This module contains functions for interacting with Azure resources,
 including resource groups, deployments, and various Azure services.
 """
 
+import functools
 import json
 import logging
 import os
+import random
 import re
 import subprocess
-import tempfile
 import threading
 import time
 from typing import Any, Literal, Optional, Tuple
@@ -20,24 +21,35 @@ from apimtypes import INFRASTRUCTURE, Endpoints, Output
 from console import print_command, print_error, print_info, print_message, print_ok, print_plain, print_val, print_warning
 from logging_config import is_debug_enabled
 
+# Fields sharing a replacement shape are fused into one alternation, so redaction is three passes over the output rather than one per field.
 _SECRET_PATTERNS: tuple[tuple[re.Pattern[str], str], ...] = (
-    # JSON-style token fields
-    (re.compile(r'("accessToken"\s*:\s*")([^"\\]+)(")', re.IGNORECASE), r'\1***REDACTED***\3'),
-    (re.compile(r'("refreshToken"\s*:\s*")([^"\\]+)(")', re.IGNORECASE), r'\1***REDACTED***\3'),
-    (re.compile(r'("client_secret"\s*:\s*")([^"\\]+)(")', re.IGNORECASE), r'\1***REDACTED***\3'),
-    # APIM subscription keys and shared keys
-    (re.compile(r'("primaryKey"\s*:\s*")([^"\\]+)(")', re.IGNORECASE), r'\1***REDACTED***\3'),
-    (re.compile(r'("secondaryKey"\s*:\s*")([^"\\]+)(")', re.IGNORECASE), r'\1***REDACTED***\3'),
-    (re.compile(r'("primarySharedKey"\s*:\s*")([^"\\]+)(")', re.IGNORECASE), r'\1***REDACTED***\3'),
-    (re.compile(r'("secondarySharedKey"\s*:\s*")([^"\\]+)(")', re.IGNORECASE), r'\1***REDACTED***\3'),
-    # Connection strings and account keys
-    (re.compile(r'("connectionString"\s*:\s*")([^"\\]+)(")', re.IGNORECASE), r'\1***REDACTED***\3'),
-    (re.compile(r'(AccountKey=)([^;"]+)', re.IGNORECASE), r'\1***REDACTED***'),
-    (re.compile(r'(SharedAccessSignature=)([^;"]+)', re.IGNORECASE), r'\1***REDACTED***'),
-    # Header-style bearer tokens
-    (re.compile(r'(Authorization\s*:\s*Bearer\s+)(\S+)', re.IGNORECASE), r'\1***REDACTED***'),
-    # api-key header
-    (re.compile(r'(api-key\s*:\s*)(\S+)', re.IGNORECASE), r'\1***REDACTED***'),
+    # JSON-style token fields, APIM subscription/shared keys and connection strings
+    (
+        re.compile(
+            r'("(?:accessToken|refreshToken|client_secret|primaryKey|secondaryKey|primarySharedKey|secondarySharedKey|connectionString)"\s*:\s*")'
+            r'([^"\\]+)(")',
+            re.IGNORECASE,
+        ),
+        r'\1***REDACTED***\3',
+    ),
+    # Account keys and SAS signatures embedded in connection strings
+    (re.compile(r'(AccountKey=|SharedAccessSignature=)([^;"]+)', re.IGNORECASE), r'\1***REDACTED***'),
+    # Header-style bearer tokens and api-key headers
+    (re.compile(r'(Authorization\s*:\s*Bearer\s+|api-key\s*:\s*)(\S+)', re.IGNORECASE), r'\1***REDACTED***'),
+)
+
+# Lowercase literals of which every _SECRET_PATTERNS match contains at least one. Output without any of them
+# cannot contain a secret, so the regex passes are skipped.
+_SECRET_HINTS = (
+    'accesstoken',
+    'refreshtoken',
+    'client_secret',
+    'key"',
+    'connectionstring',
+    'accountkey=',
+    'sharedaccesssignature=',
+    'authorization',
+    'api-key',
 )
 
 
@@ -47,6 +59,17 @@ _SECRET_PATTERNS: tuple[tuple[re.Pattern[str], str], ...] = (
 
 _ANSI_ESCAPE_RE = re.compile(r'\x1b\[[0-9;]*m')
 _AZ_COMMAND_RE = re.compile(r'^\s*az(\s|$)')
+_SHELL_OPERATOR_RE = re.compile(r'\|\||&&|[|<>]')
+_JSON_START_RE = re.compile(r'[\[{]')
+_COMMAND_TOKEN_RE = re.compile(r'"[^"]*"|\'[^\']*\'|\S+')
+_JWT_SIGNING_KEY_RE = re.compile(r'^JwtSigningKey-(.+)-\d+$')
+# Infrastructure resource group names, one per line: apim-infra-{infrastructure} or apim-infra-{infrastructure}-{index}.
+# Longer slugs come first so that e.g. 'appgw-apim-pe' is not read as 'appgw-apim' plus a bad index.
+_INFRA_RG_NAME_RE = re.compile(
+    r'^[ \t]*apim-infra-(' + '|'.join(re.escape(i.value) for i in sorted(INFRASTRUCTURE, key=lambda i: -len(i.value))) + r')(?:-(-?\d+))?[ \t\r]*$',
+    re.MULTILINE,
+)
+_STORAGE_ACCOUNT_ID_RE = re.compile(r'/subscriptions/[a-f0-9-]+/resourceGroups/[^/]+/providers/Microsoft\.Storage/storageAccounts/[^/\s]+')
 
 # Azure CLI uses shared on-disk state (e.g., token cache under the user's profile).
 # Running multiple `az ...` commands concurrently from threads can lead to intermittent
@@ -54,9 +77,36 @@ _AZ_COMMAND_RE = re.compile(r'^\s*az(\s|$)')
 # cleanups reliable.
 _AZ_CLI_LOCK = threading.Lock()
 _NESTED_DEPLOYMENT_RESOURCE_TYPE = 'microsoft.resources/deployments'
+# Fixed subprocess.run() arguments shared by the locked and unlocked call sites in run().
+_SUBPROCESS_RUN_KWARGS: dict[str, Any] = {
+    'shell': True,
+    'capture_output': True,
+    'text': True,
+    'encoding': 'utf-8',
+    'errors': 'replace',
+}
+
+# Read-only `az` queries that helpers tend to repeat within a single notebook cell. Each `az` invocation
+# pays several seconds of CLI startup, so successful results are memoized by command string - but only
+# briefly: a long-lived kernel can see `az login`, `az account set`, or resource group changes made from a
+# terminal or another kernel, none of which pass through this process.
+_CACHEABLE_AZ_PREFIXES = ('az account show', 'az ad signed-in-user show', 'az version', 'az group show --name')
+_AZ_CACHE_TTL_SECONDS = 30.0
+
+# Commands run in this process that can change what the cached queries return (signed-in identity,
+# default subscription, resource group lifecycle). Running any of them empties the cache.
+_AZ_CACHE_INVALIDATING_PREFIXES = ('az login', 'az logout', 'az account set', 'az account clear', 'az group create', 'az group delete')
+
+# Command string -> (time.monotonic() expiry, Output)
+_AZ_CACHE: dict[str, tuple[float, Output]] = {}
+_AZ_CACHE_LOCK = threading.Lock()
 
 
 def _strip_ansi(text: str) -> str:
+    # Most CLI output carries no colour codes; a substring check avoids the regex pass and the copy it returns.
+    if '\x1b' not in text:
+        return text
+
     return _ANSI_ESCAPE_RE.sub('', text)
 
 
@@ -64,6 +114,10 @@ def _redact_secrets(text: str) -> str:
     if not text:
         return text
 
+    lowered = text.lower()
+    if not any(hint in lowered for hint in _SECRET_HINTS):
+        return text
+
     redacted = text
     for pattern, replacement in _SECRET_PATTERNS:
         redacted = pattern.sub(replacement, redacted)
@@ -75,13 +129,17 @@ def _is_az_command(command: str) -> bool:
     return bool(_AZ_COMMAND_RE.match(command))
 
 
-def _maybe_add_az_debug_flag(command: str) -> str:
+def _maybe_add_az_debug_flag(command: str, debug_enabled: bool | None = None) -> str:
     """If Python logging is in DEBUG, add `--debug` to simple `az ...` commands.
 
     We try to be conservative around complex shell expressions (pipes, redirects, AND/OR).
+    Callers that already know the debug state can pass it as `debug_enabled`.
     """
 
-    if not is_debug_enabled():
+    if debug_enabled is None:
+        debug_enabled = is_debug_enabled()
+
+    if not debug_enabled:
         return command
 
     if not _is_az_command(command):
@@ -90,20 +148,14 @@ def _maybe_add_az_debug_flag(command: str) -> str:
     if '--debug' in command:
         return command
 
-    # Insert before common shell operators/redirections when present.
-    operator_candidates = ['||', '&&', '|', '>', '<']
-    earliest = None
-    for op in operator_candidates:
-        idx = command.find(op)
-        if idx == -1:
-            continue
-        earliest = idx if earliest is None else min(earliest, idx)
+    # Insert before the first common shell operator/redirection when present.
+    operator_match = _SHELL_OPERATOR_RE.search(command)
 
-    if earliest is None:
+    if operator_match is None:
         return f'{command} --debug'
 
-    before = command[:earliest].rstrip()
-    after = command[earliest:]
+    before = command[: operator_match.start()].rstrip()
+    after = command[operator_match.start() :]
     return f'{before} --debug {after.lstrip()}'
 
 
@@ -123,7 +175,7 @@ def _extract_az_cli_error_message(output_text: str) -> str:
 
     # Try to find a JSON payload anywhere in the output (common for some `az rest` failures).
     decoder = json.JSONDecoder()
-    for start in (m.start() for m in re.finditer(r'[\[{]', text)):
+    for start in (m.start() for m in _JSON_START_RE.finditer(text)):
         try:
             payload, _ = decoder.raw_decode(text[start:])
         except json.JSONDecodeError:
@@ -135,42 +187,43 @@ def _extract_az_cli_error_message(output_text: str) -> str:
             if isinstance(payload.get('message'), str):
                 return payload['message'].strip()
 
-    lines = [ln.strip() for ln in text.splitlines()]
+    # Single pass over the lines. "ERROR:" wins outright; Code/Message pairs and the first meaningful
+    # line are remembered as lower-priority fallbacks.
+    code = None
+    message = None
+    first_line = None
+    first_line_closed = False
 
-    # Most Azure CLI failures present as "ERROR: ..."
-    for ln in lines:
+    for raw_line in text.splitlines():
+        ln = raw_line.strip()
         lowered = ln.lower()
+
+        # Most Azure CLI failures present as "ERROR: ..."
         if lowered.startswith('error:'):
             return ln.split(':', 1)[1].strip() or ln
         if lowered.startswith('az: error:'):
             return ln.split(':', 2)[2].strip() or ln
 
-    # Sometimes split across Code/Message lines.
-    code = None
-    message = None
-    for ln in lines:
-        lowered = ln.lower()
+        # Sometimes split across Code/Message lines.
         if lowered.startswith('code:') and code is None:
             code = ln.split(':', 1)[1].strip()
         if lowered.startswith('message:') and message is None:
             message = ln.split(':', 1)[1].strip()
 
+        # Avoid returning traceback headers.
+        if first_line_closed or not ln or first_line is not None:
+            continue
+        if ln.startswith('Traceback (most recent call last):'):
+            first_line_closed = True
+        elif not lowered.startswith('warning:'):
+            first_line = ln
+
     if message and code:
         return f'{code}: {message}'
     if message:
         return message
 
-    # Avoid returning traceback headers.
-    for ln in lines:
-        if not ln:
-            continue
-        if ln.startswith('Traceback (most recent call last):'):
-            break
-        if ln.lower().startswith('warning:'):
-            continue
-        return ln
-
-    return ''
+    return first_line or ''
 
 
 def _tokenize_command(command: str) -> list[str]:
@@ -179,7 +232,7 @@ def _tokenize_command(command: str) -> list[str]:
     if not command:
         return []
 
-    raw_tokens = re.findall(r'"[^"]*"|\'[^\']*\'|\S+', command)
+    raw_tokens = _COMMAND_TOKEN_RE.findall(command)
     return [token[1:-1] if len(token) >= 2 and token[0] == token[-1] and token[0] in {'"', "'"} else token for token in raw_tokens]
 
 
@@ -405,20 +458,30 @@ def _get_group_deployment_failure_summary(command: str) -> str:
     return _summarize_failed_group_deployment_operations(operations, resource_group_name)
 
 
+@functools.lru_cache(maxsize=1)
+def _load_azure_roles(roles_file_path: str) -> dict[str, str]:
+    """Load the static Azure roles JSON file once per process. Failures raise and are not cached."""
+    with open(roles_file_path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def _cache_clear() -> None:
+    """Forget memoized `az` query results and the loaded Azure role map."""
+    with _AZ_CACHE_LOCK:
+        _AZ_CACHE.clear()
+
+    _load_azure_roles.cache_clear()
+
+
 def _format_duration(start_time: float) -> str:
-    minutes, seconds = divmod(time.time() - start_time, 60)
-    return f'[{int(minutes)}m:{int(seconds)}s]'
+    minutes, seconds = divmod(int(time.time() - start_time), 60)
+    return f'[{minutes}m:{seconds}s]'
 
 
 def _looks_like_json(text: str) -> bool:
+    """Cheap structural hint (first non-blank character is `{` or `[`), not a validity check."""
     stripped = text.lstrip()
-    if not stripped or stripped[0] not in '{[':
-        return False
-    try:
-        json.loads(text)
-        return True
-    except json.JSONDecodeError:
-        return False
+    return bool(stripped) and stripped[0] in '{['
 
 
 def run(
@@ -444,14 +507,38 @@ def run(
         retries: Number of retry attempts after the initial execution (default 1).
     """
 
-    command_to_run = _maybe_add_az_debug_flag(command)
+    # The logging level cannot change mid-call; resolve it once for the whole run.
+    debug_enabled = is_debug_enabled()
+    is_az_command = _is_az_command(command)
+
+    # Non-az commands (echo, python, ...) get no --debug flag, CLI lock, cache, or az error extraction.
+    command_to_run = _maybe_add_az_debug_flag(command, debug_enabled) if is_az_command else command
+    stripped_command = command_to_run.lstrip()
+
+    if is_az_command and stripped_command.startswith(_AZ_CACHE_INVALIDATING_PREFIXES):
+        _cache_clear()
+
     normalized_ok_message = ok_message or ''
     normalized_error_message = error_message or ''
 
     if log_command is None:
         log_command = bool(normalized_ok_message or normalized_error_message)
 
-    if log_command or is_debug_enabled():
+    cacheable = is_az_command and stripped_command.startswith(_CACHEABLE_AZ_PREFIXES)
+    if cacheable:
+        with _AZ_CACHE_LOCK:
+            cached_entry = _AZ_CACHE.get(command_to_run)
+
+        cached_output = cached_entry[1] if cached_entry is not None and cached_entry[0] > time.monotonic() else None
+
+        if cached_output is not None:
+            if log_command or debug_enabled:
+                print_command(f'{command_to_run} (cached)')
+            if normalized_ok_message:
+                print_ok(normalized_ok_message)
+            return cached_output
+
+    if log_command or debug_enabled:
         print_command(command_to_run)
 
     max_attempts = 1 + max(0, retries)
@@ -462,31 +549,13 @@ def run(
 
     for attempt in range(1, max_attempts + 1):  # pragma: no branch  (max_attempts >= 1)
         try:
-            lock = _AZ_CLI_LOCK if _is_az_command(command_to_run) else None
+            lock = _AZ_CLI_LOCK if is_az_command else None
 
             if lock is None:
-                completed = subprocess.run(
-                    command_to_run,
-                    shell=True,
-                    check=False,
-                    capture_output=True,
-                    text=True,
-                    encoding='utf-8',
-                    errors='replace',
-                    timeout=timeout,
-                )
+                completed = subprocess.run(command_to_run, check=False, timeout=timeout, **_SUBPROCESS_RUN_KWARGS)
             else:
                 with lock:
-                    completed = subprocess.run(
-                        command_to_run,
-                        shell=True,
-                        check=False,
-                        capture_output=True,
-                        text=True,
-                        encoding='utf-8',
-                        errors='replace',
-                        timeout=timeout,
-                    )
+                    completed = subprocess.run(command_to_run, check=False, timeout=timeout, **_SUBPROCESS_RUN_KWARGS)
             stdout_text = completed.stdout or ''
             stderr_text = completed.stderr or ''
             success = not completed.returncode
@@ -526,11 +595,11 @@ def run(
 
     display_error = ''
     deployment_failure_summary = ''
-    if not success and _is_az_command(command_to_run):
+    if not success and is_az_command:
         display_error = _extract_az_cli_error_message(combined_text)
         deployment_failure_summary = _get_group_deployment_failure_summary(command_to_run)
 
-    if is_debug_enabled():
+    if debug_enabled:
         # Azure CLI debug output is commonly written to stderr; log it at DEBUG without
         # polluting captured stdout used for JSON parsing.
         if stderr_text.strip():
@@ -551,10 +620,16 @@ def run(
 
         if normalized_error_message:
             print_error(normalized_error_message, summary_output, duration)
-        elif summary_output and is_debug_enabled():
+        elif summary_output and debug_enabled:
             print_plain(summary_output, level=logging.DEBUG)
 
-    return Output(success, output_text)
+    output = Output(success, output_text)
+
+    if cacheable and success:
+        with _AZ_CACHE_LOCK:
+            _AZ_CACHE[command_to_run] = (time.monotonic() + _AZ_CACHE_TTL_SECONDS, output)
+
+    return output
 
 
 # ------------------------------
@@ -582,8 +657,7 @@ def cleanup_old_jwt_signing_keys(apim_name: str, resource_group_name: str, curre
 
         # Extract sample folder name from current JWT key using regex
         # Pattern: JwtSigningKey-{sample_folder}-{timestamp}
-        current_key_pattern = r'^JwtSigningKey-(.+)-\d+$'
-        current_key_match = re.match(current_key_pattern, current_jwt_key_name)
+        current_key_match = _JWT_SIGNING_KEY_RE.match(current_jwt_key_name)
 
         if not current_key_match:
             print_error(
@@ -618,8 +692,8 @@ def cleanup_old_jwt_signing_keys(apim_name: str, resource_group_name: str, curre
         # print_info(f'Found {len(jwt_keys)} total JWT signing keys.')
 
         # Filter keys that belong to the same sample folder using regex
-        sample_key_pattern = rf'^JwtSigningKey-{re.escape(sample_folder)}-\d+$'
-        sample_folder_keys = [key for key in jwt_keys if re.match(sample_key_pattern, key)]
+        sample_key_re = re.compile(rf'^JwtSigningKey-{re.escape(sample_folder)}-\d+$')
+        sample_folder_keys = [key for key in jwt_keys if sample_key_re.match(key)]
 
         print_info(f"Found {len(sample_folder_keys)} JWT signing keys for sample folder '{sample_folder}'.")
 
@@ -659,6 +733,10 @@ def check_apim_blob_permissions(apim_name: str, storage_account_name: str, resou
     Check if APIM's managed identity has Storage Blob Data Reader permissions on the storage account.
     Waits for role assignments to propagate across Azure AD, which can take several minutes.
 
+    The role assignment is polled with exponential backoff: roughly 2s, 3s, 5s, 8s, 13s, 21s, then every 30s,
+    each with ±20% jitter. Most assignments propagate within seconds, so the common case returns quickly while
+    the long tail is still covered up to `max_wait_minutes`.
+
     Args:
         apim_name (str): The name of the API Management service.
         storage_account_name (str): The name of the storage account.
@@ -701,8 +779,7 @@ def check_apim_blob_permissions(apim_name: str, storage_account_name: str, resou
         return False
 
     # Extract resource ID using regex pattern, ignoring any warning text
-    resource_id_pattern = r'/subscriptions/[a-f0-9-]+/resourceGroups/[^/]+/providers/Microsoft\.Storage/storageAccounts/[^/\s]+'
-    match = re.search(resource_id_pattern, storage_account_output.text)
+    match = _STORAGE_ACCOUNT_ID_RE.search(storage_account_output.text)
 
     if not match:
         print_error('Could not parse storage account resource ID from output')
@@ -712,8 +789,9 @@ def check_apim_blob_permissions(apim_name: str, storage_account_name: str, resou
 
     # Check for role assignment with retry logic for propagation
     max_wait_seconds = max_wait_minutes * 60
-    wait_interval = 30  # Check every 30 seconds
-    elapsed_time = 0
+    max_wait_interval = 30  # Back off to at most one check every 30 seconds
+    elapsed_time = 0.0
+    attempt = 0
 
     print_info(f'Checking role assignment (will wait up to {max_wait_minutes} minute(s) for propagation)...')
 
@@ -745,7 +823,11 @@ def check_apim_blob_permissions(apim_name: str, storage_account_name: str, resou
         if not elapsed_time:
             print_info('Role assignment not found yet. Waiting for Azure AD propagation...')
         else:
-            print_info(f'Still waiting... ({elapsed_time // 60}m {elapsed_time % 60}s elapsed)')
+            print_info(f'Still waiting... ({int(elapsed_time) // 60}m {int(elapsed_time) % 60}s elapsed)')
+
+        # Jitter is applied after the cap so that capped polls stay spread out instead of falling into lock-step
+        wait_interval = min(max_wait_interval, 2 * 1.6**attempt) * random.uniform(0.8, 1.2)
+        attempt += 1
 
         if elapsed_time + wait_interval >= max_wait_seconds:
             break
@@ -774,31 +856,18 @@ def find_infrastructure_instances(infrastructure: INFRASTRUCTURE) -> list[tuple[
     """
 
     instances = []
+    infrastructure_value = infrastructure.value
 
     # Query Azure for resource groups with the infrastructure tag
-    query_cmd = f'az group list --tag infrastructure={infrastructure.value} --query "[].name" -o tsv'
+    query_cmd = f'az group list --tag infrastructure={infrastructure_value} --query "[].name" -o tsv'
     output = run(query_cmd)
 
-    if output.success and output.text.strip():
-        rg_names = [name.strip() for name in output.text.strip().split('\n') if name.strip()]
-
-        for rg_name in rg_names:
-            # Parse the resource group name to extract the index
-            # Expected format: apim-infra-{infrastructure}-{index} or apim-infra-{infrastructure}
-            prefix = f'apim-infra-{infrastructure.value}'
-
-            if rg_name == prefix:
-                # No index
-                instances.append((infrastructure, None))
-            elif rg_name.startswith(prefix + '-'):
-                # Has index
-                try:
-                    index_str = rg_name[len(prefix + '-') :]
-                    index = int(index_str)
-                    instances.append((infrastructure, index))
-                except ValueError:
-                    # Invalid index format, skip
-                    continue
+    if output.success:
+        # One scan over all names; lines not in the apim-infra-{infrastructure}[-{index}] format are skipped
+        for match in _INFRA_RG_NAME_RE.finditer(output.text):
+            if match.group(1) == infrastructure_value:
+                index = match.group(2)
+                instances.append((infrastructure, int(index) if index is not None else None))
 
     return instances
 
@@ -854,12 +923,8 @@ def get_azure_role_guid(role_name: str) -> Optional[str]:
         # Normalize the path for cross-platform compatibility
         roles_file_path = os.path.normpath(roles_file_path)
 
-        # Load the JSON file
-        with open(roles_file_path, 'r', encoding='utf-8') as file:
-            roles_data: dict[str, str] = json.load(file)
-
         # Return the GUID for the specified role name
-        return roles_data.get(role_name)
+        return _load_azure_roles(roles_file_path).get(role_name)
 
     except (FileNotFoundError, json.JSONDecodeError, OSError) as e:
         print_error(f'Failed to load Azure roles from {roles_file_path}: {str(e)}')
@@ -979,20 +1044,17 @@ def get_frontdoor_url(deployment_name: INFRASTRUCTURE, rg_name: str) -> str | No
     afd_endpoint_url: str | None = None
 
     if deployment_name == INFRASTRUCTURE.AFD_APIM_PE:
-        output = run(f'az afd profile list -g {rg_name} -o json')
+        output = run(f'az afd profile list -g {rg_name} --query "[0].name" -o tsv')
+        afd_profile_name = output.text.strip() if output.success else ''
 
-        if output.success and output.json_data:
-            afd_profile_name = output.json_data[0]['name']
+        if afd_profile_name:
             print_ok(f'Front Door Profile Name: {afd_profile_name}', blank_above=False)
 
-            if afd_profile_name:
-                output = run(f'az afd endpoint list -g {rg_name} --profile-name {afd_profile_name} -o json')
-
-                if output.success and output.json_data:
-                    afd_hostname = output.json_data[0]['hostName']
+            output = run(f'az afd endpoint list -g {rg_name} --profile-name {afd_profile_name} --query "[0].hostName" -o tsv')
+            afd_hostname = output.text.strip() if output.success else ''
 
-                    if afd_hostname:
-                        afd_endpoint_url = f'https://{afd_hostname}'
+            if afd_hostname:
+                afd_endpoint_url = f'https://{afd_hostname}'
 
     if afd_endpoint_url:
         print_ok(f'Front Door Endpoint URL: {afd_endpoint_url}', blank_above=False)
@@ -1015,14 +1077,16 @@ def get_apim_url(rg_name: str) -> str | None:
 
     apim_endpoint_url: str | None = None
 
-    output = run(f'az apim list -g {rg_name} -o json')
+    # The nested list makes tsv print name and gateway URL as one tab-separated row; a flat
+    # [name, gatewayUrl] list would be printed one value per line instead.
+    output = run(f'az apim list -g {rg_name} --query "[0].[[name, gatewayUrl]]" -o tsv')
 
-    if output.success and output.json_data:
-        apim_gateway_url = output.json_data[0]['gatewayUrl']
-        print_ok(f'APIM Service Name: {output.json_data[0]["name"]}', blank_above=False)
+    if output.success and output.text.strip():
+        apim_name, _, apim_gateway_url = output.text.strip().partition('\t')
+        print_ok(f'APIM Service Name: {apim_name}', blank_above=False)
 
-        if apim_gateway_url:
-            apim_endpoint_url = apim_gateway_url
+        if apim_gateway_url.strip():
+            apim_endpoint_url = apim_gateway_url.strip()
 
     if apim_endpoint_url:
         print_ok(f'APIM Gateway URL: {apim_endpoint_url}', blank_above=False)
@@ -1151,39 +1215,28 @@ def get_appgw_endpoint(rg_name: str) -> Tuple[str | None, str | None]:
     hostname: str | None = None
     public_ip: str | None = None
 
-    # Get Application Gateway details
-    output = run(f'az network application-gateway list -g {rg_name} -o json')
-
-    if output.success and output.json_data:
-        appgw_name = output.json_data[0]['name']
-        print_ok(f'Application Gateway Name: {appgw_name}', blank_above=False)
-
-        # Get hostname
-        http_listeners = output.json_data[0].get('httpListeners', [])
-
-        for listener in http_listeners:
-            # Assume that only a single hostname is used, not the hostnames array
-            if listener.get('hostName'):
-                hostname = listener['hostName']
+    # Get Application Gateway details, projected to the fields used below
+    output = run(
+        f'az network application-gateway list -g {rg_name}'
+        ' --query "[0].{name: name, hostNames: httpListeners[].hostName, publicIpIds: frontendIPConfigurations[].publicIPAddress.id}" -o json'
+    )
 
-        # Get frontend IP configuration to find public IP reference
-        frontend_ip_configs = output.json_data[0].get('frontendIPConfigurations', [])
-        public_ip_id = None
+    if output.success and isinstance(output.json_data, dict):
+        appgw = output.json_data
+        print_ok(f'Application Gateway Name: {appgw.get("name")}', blank_above=False)
 
-        for config in frontend_ip_configs:
-            if config.get('publicIPAddress'):
-                public_ip_id = config['publicIPAddress']['id']
-                break
+        # Assume that only a single hostname is used, not the hostnames array
+        host_names = [host_name for host_name in appgw.get('hostNames') or [] if host_name]
+        hostname = host_names[-1] if host_names else None
 
-        if public_ip_id:
-            # Extract public IP name from the resource ID
-            public_ip_name = public_ip_id.split('/')[-1]
+        # Resolve the public IP by resource ID, which also works when it lives in another resource group
+        public_ip_ids = [public_ip_id for public_ip_id in appgw.get('publicIpIds') or [] if public_ip_id]
 
-            # Get public IP details
-            ip_output = run(f'az network public-ip show -g {rg_name} -n {public_ip_name} -o json')
+        if public_ip_ids:
+            ip_output = run(f'az network public-ip show --ids {public_ip_ids[0]} --query ipAddress -o tsv')
 
-            if ip_output.success and ip_output.json_data:
-                public_ip = ip_output.json_data.get('ipAddress')
+            if ip_output.success and ip_output.text.strip():
+                public_ip = ip_output.text.strip()
 
     return hostname, public_ip
 
@@ -1222,38 +1275,20 @@ def get_unique_suffix_for_resource_group(rg_name: str) -> str:
         str: The 13-character unique string matching Bicep's uniqueString output.
     """
 
-    # Minimal ARM template that just outputs the uniqueString
-    template = json.dumps(
-        {
-            '$schema': 'https://schema.management.azure.com/schemas/2019-04-01/deploymentTemplate.json#',
-            'contentVersion': '1.0.0.0',
-            'resources': [],
-            'outputs': {'suffix': {'type': 'string', 'value': '[uniqueString(subscription().id, resourceGroup().id)]'}},
-        }
-    )
-
-    # Write template to temp file
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-        f.write(template)
-        template_path = f.name
+    # Minimal ARM template that just outputs the uniqueString; shipped alongside azure-roles.json
+    template_path = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'unique-suffix.json'))
 
-    try:
-        deployment_name = f'get-suffix-{int(time.time())}'
-        output = run(
-            f'az deployment group create --name {deployment_name} --resource-group {rg_name}'
-            f' --template-file "{template_path}" --query "properties.outputs.suffix.value" -o tsv'
-        )
+    deployment_name = f'get-suffix-{int(time.time())}'
+    output = run(
+        f'az deployment group create --name {deployment_name} --resource-group {rg_name}'
+        f' --template-file "{template_path}" --query "properties.outputs.suffix.value" -o tsv'
+    )
 
-        if output.success and output.text.strip():
-            return output.text.strip()
+    if output.success and output.text.strip():
+        return output.text.strip()
 
-        print_error('Could not get uniqueString from Azure.')
-        return ''
-    finally:
-        try:
-            os.unlink(template_path)
-        except Exception:  # pragma: no cover
-            pass
+    print_error('Could not get uniqueString from Azure.')
+    return ''
 
 
 def get_rg_name(deployment_name: str, index: int | None = None) -> str:
@@ -19,6 +19,7 @@ sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 from test_helpers import (
     MockApimRequestsPatches,
     MockInfrastructuresPatches,
+    RunDispatcher,
     create_mock_http_response,
     create_mock_output,
     create_sample_apis,
@@ -65,12 +66,25 @@ def _skip_az_run_retry_sleep(monkeypatch: pytest.MonkeyPatch) -> None:
     ``azure_resources.run`` sleeps several seconds between retry attempts to absorb
     transient DNS/network failures during real Azure calls. Unit tests never rely on
     that wall-clock delay, so patching it suite-wide keeps the test run fast even when
-    many tests exercise the failure path (which retries by default).
+    many tests exercise the failure path (which retries by default). The same patch
+    covers the polling waits elsewhere in ``azure_resources``, so individual tests do
+    not need to patch ``time.sleep`` themselves.
     """
 
     monkeypatch.setattr(az.time, 'sleep', lambda _seconds: None)
 
 
+@pytest.fixture(autouse=True)
+def _clear_az_cache() -> None:
+    """Start every test with an empty ``azure_resources`` query cache and role map.
+
+    ``azure_resources.run`` memoizes read-only ``az`` queries for 30 seconds, which outlives a
+    single test, so a result recorded by one test must not leak into the next.
+    """
+
+    az._cache_clear()
+
+
 # ------------------------------
 #    SHARED FIXTURES
 # ------------------------------
@@ -123,6 +137,14 @@ def mock_az(infrastructures_patches):
     return infrastructures_patches.az
 
 
+@pytest.fixture
+def run_dispatcher(monkeypatch) -> RunDispatcher:
+    """Install an empty RunDispatcher as azure_resources.run; tests register routes with ``.on()``."""
+    dispatcher = RunDispatcher()
+    monkeypatch.setattr(az, 'run', dispatcher)
+    return dispatcher
+
+
 @pytest.fixture
 def mock_az_success():
     """Pre-configured successful Azure CLI output."""
@@ -601,6 +601,31 @@ class TestOutput:
 
         assert output.jsonParseException is not None
 
+    def test_json_is_parsed_lazily_and_once(self, monkeypatch):
+        """Test Output defers JSON parsing until json_data is first read, then caches it."""
+        calls = []
+        monkeypatch.setattr(apimtypes, 'is_string_json', lambda text: calls.append(text) or True)
+
+        output = Output(success=True, text='{"key": "value"}')
+        assert not calls
+
+        assert output.is_json is True
+        assert output.json_data == {'key': 'value'}
+        assert output.jsonParseException is None
+        assert len(calls) == 1
+
+    def test_assigned_json_data_skips_parsing(self, monkeypatch):
+        """Test that assigning json_data directly replaces the lazy parse."""
+        monkeypatch.setattr(apimtypes, 'extract_json', lambda text: pytest.fail('text should not be parsed'))
+        monkeypatch.setattr(apimtypes, 'is_string_json', lambda text: pytest.fail('text should not be parsed'))
+
+        output = Output(success=True, text='not json')
+        output.json_data = {'name': 'apim'}
+
+        assert output.json_data == {'name': 'apim'}
+        assert output.is_json is True
+        assert output.jsonParseException is None
+
     def test_json_extraction_from_mixed_text(self):
         """Test Output extracts JSON embedded within non-JSON text."""
         text = 'info: {"properties": {"outputs": {"endpoint": {"value": "https://mixed"}}}} end'
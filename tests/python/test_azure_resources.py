@@ -2,56 +2,110 @@
 Tests for azure_resources module.
 """
 
+import io
 import json
 import time
-from unittest.mock import Mock, call, mock_open, patch
+from types import SimpleNamespace
+from unittest.mock import Mock
 
 # APIM Samples imports
 import azure_resources as az
 import pytest
 from apimtypes import INFRASTRUCTURE, Endpoints, Output
-from test_helpers import suppress_module_functions
+from test_helpers import RunDispatcher, create_mock_output, patch_run_sequence
 
 # ------------------------------
 #    TEST DATA
 # ------------------------------
 
 
+# Role map serialized once at import so role-lookup tests only pay for the in-memory read
+_ROLE_GUIDS = {
+    'Owner': 'role-owner',
+    'Contributor': 'role-contrib',
+    'Reader': 'role-reader',
+    'Storage Blob Data Reader': 'role-storage-reader',
+    'Storage Account Contributor': 'role-storage-contrib',
+    'Key Vault Administrator': 'role-kv-admin',
+}
+_ROLE_GUIDS_JSON = json.dumps(_ROLE_GUIDS)
+
+# Front Door profile name (tsv) shared by the endpoint hostname tests
+_AFD_PROFILE_TSV = 'afd-profile\n'
+
+# Front Door profile lookup result shared by the parametrized get_frontdoor_url cases
+_AFD_TEST_PROFILE = Output(True, 'test-afd\n')
+
+
 # Static account info data for reuse across tests
 def _create_account_output():
     """Create a standard account output for testing."""
-    output = Output(True, '{}')
-    output.json_data = {'user': {'name': 'test.user@example.com'}, 'id': 'sub-123', 'tenantId': 'tenant-123', 'name': 'Test Subscription'}
+    output = create_mock_output(
+        json_data={'user': {'name': 'test.user@example.com'}, 'id': 'sub-123', 'tenantId': 'tenant-123', 'name': 'Test Subscription'}
+    )
     return output
 
 
+# ------------------------------
+#    FIXTURES
+# ------------------------------
+
+
+@pytest.fixture(autouse=True, scope='module')
+def _suppress_console_output():
+    """Silence the console helpers imported into azure_resources once for the whole module."""
+
+    def _noop(*args, **kwargs):
+        return None
+
+    with pytest.MonkeyPatch.context() as mp:
+        for name in ('print_command', 'print_error', 'print_info', 'print_message', 'print_ok', 'print_plain', 'print_val', 'print_warning'):
+            mp.setattr(az, name, _noop)
+        yield
+
+
+# A single run mock reused across tests; the mock_run fixture resets it and installs it as az.run
+_RUN_MOCK = Mock(spec=az.run)
+
+
+@pytest.fixture
+def mock_run(monkeypatch) -> Mock:
+    """Install the shared az.run mock with its calls, return value and side effect cleared."""
+    _RUN_MOCK.reset_mock(return_value=True, side_effect=True)
+    monkeypatch.setattr(az, 'run', _RUN_MOCK)
+    return _RUN_MOCK
+
+
 # ------------------------------
 #    AZURE ROLE TESTS
 # ------------------------------
 
 
-def test_get_azure_role_guid_success():
+def test_get_azure_role_guid_success(monkeypatch):
     """Test successful retrieval of Azure role GUID."""
 
-    mock_data = {'Contributor': 'role-guid-123', 'Reader': 'role-guid-67890'}
+    monkeypatch.setattr(az, 'open', lambda *_, **__: io.StringIO('{"Contributor": "role-guid-123", "Reader": "role-guid-67890"}'), raising=False)
 
-    with patch('builtins.open', mock_open(read_data=json.dumps(mock_data))):
-        result = az.get_azure_role_guid('Contributor')
+    result = az.get_azure_role_guid('Contributor')
 
-        assert result == 'role-guid-123'
+    assert result == 'role-guid-123'
 
 
-def test_get_azure_role_guid_failure():
+def test_get_azure_role_guid_failure(monkeypatch):
     """Test get_azure_role_guid returns None when file not found."""
 
-    # Mock os.path functions to return a non-existent path
-    with patch('azure_resources.os.path.abspath', return_value='/nonexistent/path'):
-        with patch('azure_resources.os.path.dirname', return_value='/nonexistent'):
-            with patch('azure_resources.os.path.join', return_value='/nonexistent/azure-roles.json'):
-                with patch('azure_resources.os.path.normpath', return_value='/nonexistent/azure-roles.json'):
-                    result = az.get_azure_role_guid('NonExistentRole')
+    # Point the module's os reference at a fake path layer that resolves to a non-existent file
+    fake_path = SimpleNamespace(
+        abspath=lambda _p: '/nonexistent/path',
+        dirname=lambda _p: '/nonexistent',
+        join=lambda *_parts: '/nonexistent/azure-roles.json',
+        normpath=lambda _p: '/nonexistent/azure-roles.json',
+    )
+    monkeypatch.setattr(az, 'os', SimpleNamespace(path=fake_path))
 
-                    assert result is None
+    result = az.get_azure_role_guid('NonExistentRole')
+
+    assert result is None
 
 
 # ------------------------------
@@ -59,61 +113,58 @@ def test_get_azure_role_guid_failure():
 # ------------------------------
 
 
-def test_does_resource_group_exist_true():
+def test_does_resource_group_exist_true(mock_run):
     """Test checking if resource group exists - returns True."""
 
-    with patch('azure_resources.run') as mock_run:
-        mock_run.return_value = Output(True, 'true')
+    mock_run.return_value = Output(True, 'true')
 
-        result = az.does_resource_group_exist('test-rg')
+    result = az.does_resource_group_exist('test-rg')
 
-        assert result is True
-        mock_run.assert_called_once_with('az group exists --name test-rg')
+    assert result is True
+    assert mock_run.call_count == 1
+    assert mock_run.call_args.args[0] == 'az group exists --name test-rg'
 
 
-def test_does_resource_group_exist_false():
+def test_does_resource_group_exist_false(mock_run):
     """Test checking if resource group exists - returns False."""
 
-    with patch('azure_resources.run') as mock_run:
-        mock_run.return_value = Output(True, 'false')
+    mock_run.return_value = Output(True, 'false')
 
-        result = az.does_resource_group_exist('nonexistent-rg')
+    result = az.does_resource_group_exist('nonexistent-rg')
 
-        assert result is False
+    assert result is False
 
 
-def test_get_resource_group_location_success():
+def test_get_resource_group_location_success(mock_run):
     """Test successful retrieval of resource group location."""
 
-    with patch('azure_resources.run') as mock_run:
-        mock_run.return_value = Output(True, 'eastus2\n')
+    mock_run.return_value = Output(True, 'eastus2\n')
 
-        result = az.get_resource_group_location('test-rg')
+    result = az.get_resource_group_location('test-rg')
 
-        assert result == 'eastus2'
-        mock_run.assert_called_once_with('az group show --name test-rg --query "location" -o tsv')
+    assert result == 'eastus2'
+    assert mock_run.call_count == 1
+    assert mock_run.call_args.args[0] == 'az group show --name test-rg --query "location" -o tsv'
 
 
-def test_get_resource_group_location_failure():
+def test_get_resource_group_location_failure(mock_run):
     """Test get_resource_group_location returns None on failure."""
 
-    with patch('azure_resources.run') as mock_run:
-        mock_run.return_value = Output(False, 'error message')
+    mock_run.return_value = Output(False, 'error message')
 
-        result = az.get_resource_group_location('nonexistent-rg')
+    result = az.get_resource_group_location('nonexistent-rg')
 
-        assert result is None
+    assert result is None
 
 
-def test_get_resource_group_location_empty():
+def test_get_resource_group_location_empty(mock_run):
     """Test get_resource_group_location returns None on empty response."""
 
-    with patch('azure_resources.run') as mock_run:
-        mock_run.return_value = Output(True, '')
+    mock_run.return_value = Output(True, '')
 
-        result = az.get_resource_group_location('test-rg')
+    result = az.get_resource_group_location('test-rg')
 
-        assert result is None
+    assert result is None
 
 
 # ------------------------------
@@ -121,49 +172,45 @@ def test_get_resource_group_location_empty():
 # ------------------------------
 
 
-def test_get_account_info_success():
+def test_get_account_info_success(monkeypatch):
     """Test successful retrieval of account information."""
 
-    with patch('azure_resources.run') as mock_run:
-        account_output = _create_account_output()
+    account_output = _create_account_output()
 
-        ad_user_output = Output(True, '{}')
-        ad_user_output.json_data = {'id': 'user-id-123'}
+    ad_user_output = create_mock_output(json_data={'id': 'user-id-123'})
 
-        mock_run.side_effect = [account_output, ad_user_output]
+    patch_run_sequence(monkeypatch, az, [account_output, ad_user_output])
 
-        current_user, current_user_id, tenant_id, subscription_id = az.get_account_info()
+    current_user, current_user_id, tenant_id, subscription_id = az.get_account_info()
 
-        assert current_user == 'test.user@example.com'
-        assert current_user_id == 'user-id-123'
-        assert tenant_id == 'tenant-123'
-        assert subscription_id == 'sub-123'
+    assert current_user == 'test.user@example.com'
+    assert current_user_id == 'user-id-123'
+    assert tenant_id == 'tenant-123'
+    assert subscription_id == 'sub-123'
 
 
-def test_get_account_info_failure():
+def test_get_account_info_failure(mock_run):
     """Test get_account_info raises exception on failure."""
 
-    with patch('azure_resources.run') as mock_run:
-        mock_run.return_value = Output(False, 'authentication error')
+    mock_run.return_value = Output(False, 'authentication error')
 
-        with pytest.raises(Exception) as exc_info:
-            az.get_account_info()
+    with pytest.raises(Exception) as exc_info:
+        az.get_account_info()
 
-        assert 'Failed to retrieve account information' in str(exc_info.value)
+    assert 'Failed to retrieve account information' in str(exc_info.value)
 
 
-def test_get_account_info_no_json():
+def test_get_account_info_no_json(monkeypatch, mock_run):
     """Test get_account_info raises exception when no JSON data."""
 
-    with patch('azure_resources.run') as mock_run:
-        output = Output(True, 'some text')
-        output.json_data = None
-        mock_run.return_value = output
+    output = Output(True, 'some text')
+    output.json_data = None
+    mock_run.return_value = output
 
-        with pytest.raises(Exception) as exc_info:
-            az.get_account_info()
+    with pytest.raises(Exception) as exc_info:
+        az.get_account_info()
 
-        assert 'Failed to retrieve account information' in str(exc_info.value)
+    assert 'Failed to retrieve account information' in str(exc_info.value)
 
 
 # ------------------------------
@@ -171,367 +218,152 @@ def test_get_account_info_no_json():
 # ------------------------------
 
 
-def test_get_apim_subscription_key_selects_active_and_returns_primary(monkeypatch):
-    """Selects an active subscription when multiple exist and returns the primaryKey."""
-
-    calls: list[str] = []
-
-    def fake_run(cmd: str, *args, **kwargs):
-        calls.append(cmd)
-
-        if cmd.startswith('az account show'):
-            return Output(True, 'sub-123\n')
-
-        if 'az rest --method get' in cmd and '/subscriptions?' in cmd:
-            payload = {
-                'value': [
-                    {'name': 'sid-1', 'properties': {'state': 'suspended', 'displayName': 'Suspended'}},
-                    {'name': 'sid-2', 'properties': {'state': 'active', 'displayName': 'Active'}},
-                ]
-            }
-            return Output(True, json.dumps(payload))
-
-        if 'az rest --method post' in cmd and 'listSecrets' in cmd:
-            assert '/subscriptions/sid-2/listSecrets' in cmd
-            return Output(True, json.dumps({'primaryKey': 'pk-abc', 'secondaryKey': 'sk-def'}))
-
-        return Output(False, 'unexpected command')
-
-    monkeypatch.setattr(az, 'run', fake_run)
-
-    key = az.get_apim_subscription_key('apim-name', 'rg-name')
-
-    assert key == 'pk-abc'
-    assert any('az rest --method get' in c for c in calls)
-    assert any('listSecrets' in c for c in calls)
-
-
-def test_get_apim_subscription_key_returns_none_when_no_subscriptions(monkeypatch):
-    """Returns None when APIM has no subscriptions."""
-
-    def fake_run(cmd: str, *args, **kwargs):
-        if cmd.startswith('az account show'):
-            return Output(True, 'sub-123\n')
-
-        if 'az rest --method get' in cmd and '/subscriptions?' in cmd:
-            return Output(True, json.dumps({'value': []}))
-
-        return Output(False, 'unexpected command')
-
-    monkeypatch.setattr(az, 'run', fake_run)
-
-    assert az.get_apim_subscription_key('apim-name', 'rg-name') is None
-
-
-def test_get_apim_subscription_key_uses_provided_sid(monkeypatch):
-    """Uses the provided sid directly and skips listing subscriptions."""
-
-    calls: list[str] = []
-
-    def fake_run(cmd: str, *args, **kwargs):
-        calls.append(cmd)
-
-        if cmd.startswith('az account show'):
-            return Output(True, 'sub-123\n')
-
-        if 'az rest --method post' in cmd and 'listSecrets' in cmd:
-            assert '/subscriptions/sid-explicit/listSecrets' in cmd
-            return Output(True, json.dumps({'primaryKey': 'pk-xyz'}))
-
-        return Output(False, 'unexpected command')
-
-    monkeypatch.setattr(az, 'run', fake_run)
-
-    key = az.get_apim_subscription_key('apim-name', 'rg-name', sid='sid-explicit')
-    assert key == 'pk-xyz'
-    assert not any('az rest --method get' in c and '/subscriptions?' in c for c in calls)
-
-
-def test_get_apim_subscription_key_account_show_fails(monkeypatch):
-    """Returns None when az account show fails."""
-
-    def fake_run(cmd: str, *args, **kwargs):
-        if cmd.startswith('az account show'):
-            return Output(False, '')
-
-        return Output(False, 'unexpected command')
-
-    monkeypatch.setattr(az, 'run', fake_run)
-
-    assert az.get_apim_subscription_key('apim-name', 'rg-name') is None
-
-
-def test_get_apim_subscription_key_account_show_empty(monkeypatch):
-    """Returns None when az account show returns empty text."""
-
-    def fake_run(cmd: str, *args, **kwargs):
-        if cmd.startswith('az account show'):
-            return Output(True, '  \n  ')
-
-        return Output(False, 'unexpected command')
-
-    monkeypatch.setattr(az, 'run', fake_run)
-
-    assert az.get_apim_subscription_key('apim-name', 'rg-name') is None
-
-
-def test_get_apim_subscription_key_no_active_uses_first(monkeypatch):
-    """Uses the first subscription when none are active."""
-
-    calls: list[str] = []
-
-    def fake_run(cmd: str, *args, **kwargs):
-        calls.append(cmd)
-
-        if cmd.startswith('az account show'):
-            return Output(True, 'sub-123\n')
-
-        if 'az rest --method get' in cmd and '/subscriptions?' in cmd:
-            payload = {
-                'value': [
-                    {'name': 'sid-1', 'properties': {'state': 'suspended', 'displayName': 'First'}},
-                    {'name': 'sid-2', 'properties': {'state': 'cancelled', 'displayName': 'Second'}},
-                ]
-            }
-            return Output(True, json.dumps(payload))
-
-        if 'az rest --method post' in cmd and 'listSecrets' in cmd:
-            assert '/subscriptions/sid-1/listSecrets' in cmd
-            return Output(True, json.dumps({'primaryKey': 'pk-first', 'secondaryKey': 'sk-first'}))
-
-        return Output(False, 'unexpected command')
-
-    monkeypatch.setattr(az, 'run', fake_run)
-
-    key = az.get_apim_subscription_key('apim-name', 'rg-name')
-
-    assert key == 'pk-first'
-
-
-def test_get_apim_subscription_key_subscription_name_empty(monkeypatch):
-    """Returns None when subscription name is empty or missing."""
-
-    def fake_run(cmd: str, *args, **kwargs):
-        if cmd.startswith('az account show'):
-            return Output(True, 'sub-123\n')
-
-        if 'az rest --method get' in cmd and '/subscriptions?' in cmd:
-            payload = {
-                'value': [
-                    {'name': '', 'properties': {'state': 'active', 'displayName': 'Empty name'}},
-                ]
-            }
-            return Output(True, json.dumps(payload))
-
-        return Output(False, 'unexpected command')
-
-    monkeypatch.setattr(az, 'run', fake_run)
-
-    assert az.get_apim_subscription_key('apim-name', 'rg-name') is None
+def _subscription_list(*subscriptions: dict) -> str:
+    """Serialize an APIM subscription list REST payload."""
+    return json.dumps({'value': list(subscriptions)})
+
+
+# Canned responses for the subscription-key commands, serialized once at import; each Output parses its JSON lazily on first access
+_SUBSCRIPTION_KEY_RESPONSES: dict[str, Output] = {
+    'account_show_ok': Output(True, 'sub-123\n'),
+    'account_show_failed': Output(False, ''),
+    'account_show_blank': Output(True, '  \n  '),
+    'subs_second_active': Output(
+        True,
+        _subscription_list(
+            {'name': 'sid-1', 'properties': {'state': 'suspended', 'displayName': 'Suspended'}},
+            {'name': 'sid-2', 'properties': {'state': 'active', 'displayName': 'Active'}},
+        ),
+    ),
+    'subs_none_active': Output(
+        True,
+        _subscription_list(
+            {'name': 'sid-1', 'properties': {'state': 'suspended', 'displayName': 'First'}},
+            {'name': 'sid-2', 'properties': {'state': 'cancelled', 'displayName': 'Second'}},
+        ),
+    ),
+    'subs_active': Output(True, _subscription_list({'name': 'sid-1', 'properties': {'state': 'active', 'displayName': 'Active'}})),
+    'subs_empty': Output(True, _subscription_list()),
+    'subs_empty_name': Output(True, _subscription_list({'name': '', 'properties': {'state': 'active', 'displayName': 'Empty name'}})),
+    'subs_missing_name': Output(True, _subscription_list({'properties': {'state': 'active', 'displayName': 'No name key'}})),
+    'secrets_ok': Output(True, json.dumps({'primaryKey': 'pk-abc', 'secondaryKey': 'sk-def'})),
+    'secrets_explicit': Output(True, json.dumps({'primaryKey': 'pk-xyz'})),
+    'secrets_first': Output(True, json.dumps({'primaryKey': 'pk-first', 'secondaryKey': 'sk-first'})),
+    'secrets_secondary': Output(True, json.dumps({'primaryKey': 'pk-abc', 'secondaryKey': 'sk-xyz'})),
+    'secrets_custom': Output(True, json.dumps({'primaryKey': 'pk-custom', 'secondaryKey': 'sk-custom'})),
+    'secrets_blank': Output(True, json.dumps({'primaryKey': '  ', 'secondaryKey': 'sk-xyz'})),
+    'secrets_not_string': Output(True, json.dumps({'primaryKey': 123, 'secondaryKey': 'sk-xyz'})),
+    'secrets_missing_key': Output(True, json.dumps({'someOtherKey': 'value'})),
+    'secrets_not_dict': Output(True, json.dumps(['not', 'a', 'dict'])),
+    'secrets_failed': Output(False, 'API error'),
+}
+
+
+# Command substring that identifies each az call made by get_apim_subscription_key
+_SUBSCRIPTION_KEY_COMMANDS = {'account_show': 'az account show', 'subscriptions': '/subscriptions?', 'list_secrets': '/listSecrets'}
+
+
+def _route_subscription_key_commands(run_dispatcher: RunDispatcher, response_map: dict[str, str]) -> None:
+    """Register the canned response named in response_map for each subscription-key command kind."""
+    for kind, name in response_map.items():
+        run_dispatcher.on(_SUBSCRIPTION_KEY_COMMANDS[kind], _SUBSCRIPTION_KEY_RESPONSES[name])
 
 
-def test_get_apim_subscription_key_subscription_name_missing(monkeypatch):
-    """Returns None when subscription has no name key."""
-
-    def fake_run(cmd: str, *args, **kwargs):
-        if cmd.startswith('az account show'):
-            return Output(True, 'sub-123\n')
-
-        if 'az rest --method get' in cmd and '/subscriptions?' in cmd:
-            payload = {
-                'value': [
-                    {'properties': {'state': 'active', 'displayName': 'No name key'}},
-                ]
-            }
-            return Output(True, json.dumps(payload))
-
-        return Output(False, 'unexpected command')
-
-    monkeypatch.setattr(az, 'run', fake_run)
-
-    assert az.get_apim_subscription_key('apim-name', 'rg-name') is None
-
-
-def test_get_apim_subscription_key_secrets_call_fails(monkeypatch):
-    """Returns None when listSecrets REST call fails."""
-
-    def fake_run(cmd: str, *args, **kwargs):
-        if cmd.startswith('az account show'):
-            return Output(True, 'sub-123\n')
-
-        if 'az rest --method get' in cmd and '/subscriptions?' in cmd:
-            payload = {
-                'value': [
-                    {'name': 'sid-1', 'properties': {'state': 'active', 'displayName': 'Active'}},
-                ]
-            }
-            return Output(True, json.dumps(payload))
-
-        if 'az rest --method post' in cmd and 'listSecrets' in cmd:
-            return Output(False, 'API error')
-
-        return Output(False, 'unexpected command')
-
-    monkeypatch.setattr(az, 'run', fake_run)
-
-    assert az.get_apim_subscription_key('apim-name', 'rg-name') is None
-
-
-def test_get_apim_subscription_key_secrets_not_dict(monkeypatch):
-    """Returns None when listSecrets returns non-dict JSON."""
-
-    def fake_run(cmd: str, *args, **kwargs):
-        if cmd.startswith('az account show'):
-            return Output(True, 'sub-123\n')
-
-        if 'az rest --method get' in cmd and '/subscriptions?' in cmd:
-            payload = {
-                'value': [
-                    {'name': 'sid-1', 'properties': {'state': 'active', 'displayName': 'Active'}},
-                ]
-            }
-            return Output(True, json.dumps(payload))
-
-        if 'az rest --method post' in cmd and 'listSecrets' in cmd:
-            return Output(True, json.dumps(['not', 'a', 'dict']))
-
-        return Output(False, 'unexpected command')
-
-    monkeypatch.setattr(az, 'run', fake_run)
-
-    assert az.get_apim_subscription_key('apim-name', 'rg-name') is None
-
-
-def test_get_apim_subscription_key_returns_secondary_key(monkeypatch):
-    """Returns secondaryKey when requested."""
-
-    def fake_run(cmd: str, *args, **kwargs):
-        if cmd.startswith('az account show'):
-            return Output(True, 'sub-123\n')
-
-        if 'az rest --method get' in cmd and '/subscriptions?' in cmd:
-            payload = {
-                'value': [
-                    {'name': 'sid-1', 'properties': {'state': 'active', 'displayName': 'Active'}},
-                ]
-            }
-            return Output(True, json.dumps(payload))
-
-        if 'az rest --method post' in cmd and 'listSecrets' in cmd:
-            return Output(True, json.dumps({'primaryKey': 'pk-abc', 'secondaryKey': 'sk-xyz'}))
-
-        return Output(False, 'unexpected command')
-
-    monkeypatch.setattr(az, 'run', fake_run)
-
-    key = az.get_apim_subscription_key('apim-name', 'rg-name', key_name='secondaryKey')
-
-    assert key == 'sk-xyz'
-
-
-def test_get_apim_subscription_key_key_value_empty(monkeypatch):
-    """Returns None when key value is empty string."""
-
-    def fake_run(cmd: str, *args, **kwargs):
-        if cmd.startswith('az account show'):
-            return Output(True, 'sub-123\n')
-
-        if 'az rest --method get' in cmd and '/subscriptions?' in cmd:
-            payload = {
-                'value': [
-                    {'name': 'sid-1', 'properties': {'state': 'active', 'displayName': 'Active'}},
-                ]
-            }
-            return Output(True, json.dumps(payload))
-
-        if 'az rest --method post' in cmd and 'listSecrets' in cmd:
-            return Output(True, json.dumps({'primaryKey': '  ', 'secondaryKey': 'sk-xyz'}))
-
-        return Output(False, 'unexpected command')
-
-    monkeypatch.setattr(az, 'run', fake_run)
-
-    assert az.get_apim_subscription_key('apim-name', 'rg-name') is None
-
-
-def test_get_apim_subscription_key_key_value_not_string(monkeypatch):
-    """Returns None when key value is not a string."""
+class TestGetApimSubscriptionKey:
+    """Test get_apim_subscription_key."""
 
-    def fake_run(cmd: str, *args, **kwargs):
-        if cmd.startswith('az account show'):
-            return Output(True, 'sub-123\n')
+    def test_get_apim_subscription_key_invalid_params(self):
+        result = az.get_apim_subscription_key('', 'rg')
+        assert result is None
 
-        if 'az rest --method get' in cmd and '/subscriptions?' in cmd:
-            payload = {
-                'value': [
-                    {'name': 'sid-1', 'properties': {'state': 'active', 'displayName': 'Active'}},
-                ]
-            }
-            return Output(True, json.dumps(payload))
+        result = az.get_apim_subscription_key('apim', '')
+        assert result is None
 
-        if 'az rest --method post' in cmd and 'listSecrets' in cmd:
-            return Output(True, json.dumps({'primaryKey': 123, 'secondaryKey': 'sk-xyz'}))
+    def test_get_apim_subscription_key_selects_active_and_returns_primary(self, run_dispatcher):
+        """Selects an active subscription when multiple exist and returns the primaryKey."""
 
-        return Output(False, 'unexpected command')
+        response_map = {'account_show': 'account_show_ok', 'subscriptions': 'subs_second_active', 'list_secrets': 'secrets_ok'}
+        _route_subscription_key_commands(run_dispatcher, response_map)
 
-    monkeypatch.setattr(az, 'run', fake_run)
+        key = az.get_apim_subscription_key('apim-name', 'rg-name')
 
-    assert az.get_apim_subscription_key('apim-name', 'rg-name') is None
+        assert key == 'pk-abc'
+        assert any('az rest --method get' in c for c in run_dispatcher.calls)
+        assert any('/subscriptions/sid-2/listSecrets' in c for c in run_dispatcher.calls)
 
+    def test_get_apim_subscription_key_uses_provided_sid(self, run_dispatcher):
+        """Uses the provided sid directly and skips listing subscriptions."""
 
-def test_get_apim_subscription_key_key_missing(monkeypatch):
-    """Returns None when requested key is not in response."""
+        response_map = {'account_show': 'account_show_ok', 'list_secrets': 'secrets_explicit'}
+        _route_subscription_key_commands(run_dispatcher, response_map)
 
-    def fake_run(cmd: str, *args, **kwargs):
-        if cmd.startswith('az account show'):
-            return Output(True, 'sub-123\n')
+        key = az.get_apim_subscription_key('apim-name', 'rg-name', sid='sid-explicit')
+        assert key == 'pk-xyz'
+        assert any('/subscriptions/sid-explicit/listSecrets' in c for c in run_dispatcher.calls)
+        assert not any('az rest --method get' in c and '/subscriptions?' in c for c in run_dispatcher.calls)
 
-        if 'az rest --method get' in cmd and '/subscriptions?' in cmd:
-            payload = {
-                'value': [
-                    {'name': 'sid-1', 'properties': {'state': 'active', 'displayName': 'Active'}},
-                ]
-            }
-            return Output(True, json.dumps(payload))
+    @pytest.mark.parametrize(
+        'response_map',
+        [
+            pytest.param({'account_show': 'account_show_failed'}, id='account_show_fails'),
+            pytest.param({'account_show': 'account_show_blank'}, id='account_show_empty'),
+            pytest.param({'account_show': 'account_show_ok', 'subscriptions': 'subs_empty'}, id='no_subscriptions'),
+            pytest.param({'account_show': 'account_show_ok', 'subscriptions': 'subs_empty_name'}, id='subscription_name_empty'),
+            pytest.param({'account_show': 'account_show_ok', 'subscriptions': 'subs_missing_name'}, id='subscription_name_missing'),
+            pytest.param(
+                {'account_show': 'account_show_ok', 'subscriptions': 'subs_active', 'list_secrets': 'secrets_failed'}, id='secrets_call_fails'
+            ),
+            pytest.param(
+                {'account_show': 'account_show_ok', 'subscriptions': 'subs_active', 'list_secrets': 'secrets_not_dict'}, id='secrets_not_dict'
+            ),
+            pytest.param({'account_show': 'account_show_ok', 'subscriptions': 'subs_active', 'list_secrets': 'secrets_blank'}, id='key_value_empty'),
+            pytest.param(
+                {'account_show': 'account_show_ok', 'subscriptions': 'subs_active', 'list_secrets': 'secrets_not_string'}, id='key_value_not_string'
+            ),
+            pytest.param(
+                {'account_show': 'account_show_ok', 'subscriptions': 'subs_active', 'list_secrets': 'secrets_missing_key'}, id='key_missing'
+            ),
+        ],
+    )
+    def test_get_apim_subscription_key_returns_none(self, run_dispatcher, response_map):
+        """Returns None when account lookup, subscription selection, or key extraction fails."""
 
-        if 'az rest --method post' in cmd and 'listSecrets' in cmd:
-            return Output(True, json.dumps({'someOtherKey': 'value'}))
+        _route_subscription_key_commands(run_dispatcher, response_map)
 
-        return Output(False, 'unexpected command')
+        assert az.get_apim_subscription_key('apim-name', 'rg-name') is None
 
-    monkeypatch.setattr(az, 'run', fake_run)
+    def test_get_apim_subscription_key_no_active_uses_first(self, run_dispatcher):
+        """Uses the first subscription when none are active."""
 
-    assert az.get_apim_subscription_key('apim-name', 'rg-name') is None
+        response_map = {'account_show': 'account_show_ok', 'subscriptions': 'subs_none_active', 'list_secrets': 'secrets_first'}
+        _route_subscription_key_commands(run_dispatcher, response_map)
 
+        key = az.get_apim_subscription_key('apim-name', 'rg-name')
 
-def test_get_apim_subscription_key_uses_provided_subscription_id(monkeypatch):
-    """Uses provided subscription_id and skips az account show."""
+        assert key == 'pk-first'
+        assert any('/subscriptions/sid-1/listSecrets' in c for c in run_dispatcher.calls)
 
-    calls: list[str] = []
+    def test_get_apim_subscription_key_returns_secondary_key(self, run_dispatcher):
+        """Returns secondaryKey when requested."""
 
-    def fake_run(cmd: str, *args, **kwargs):
-        calls.append(cmd)
+        response_map = {'account_show': 'account_show_ok', 'subscriptions': 'subs_active', 'list_secrets': 'secrets_secondary'}
+        _route_subscription_key_commands(run_dispatcher, response_map)
 
-        if 'az rest --method get' in cmd and '/subscriptions?' in cmd:
-            assert '/subscriptions/custom-sub-id/' in cmd
-            payload = {
-                'value': [
-                    {'name': 'sid-1', 'properties': {'state': 'active', 'displayName': 'Active'}},
-                ]
-            }
-            return Output(True, json.dumps(payload))
+        key = az.get_apim_subscription_key('apim-name', 'rg-name', key_name='secondaryKey')
 
-        if 'az rest --method post' in cmd and 'listSecrets' in cmd:
-            return Output(True, json.dumps({'primaryKey': 'pk-custom', 'secondaryKey': 'sk-custom'}))
+        assert key == 'sk-xyz'
 
-        return Output(False, 'unexpected command')
+    def test_get_apim_subscription_key_uses_provided_subscription_id(self, run_dispatcher):
+        """Uses provided subscription_id and skips az account show."""
 
-    monkeypatch.setattr(az, 'run', fake_run)
+        response_map = {'subscriptions': 'subs_active', 'list_secrets': 'secrets_custom'}
+        _route_subscription_key_commands(run_dispatcher, response_map)
 
-    key = az.get_apim_subscription_key('apim-name', 'rg-name', subscription_id='custom-sub-id')
+        key = az.get_apim_subscription_key('apim-name', 'rg-name', subscription_id='custom-sub-id')
 
-    assert key == 'pk-custom'
-    assert not any('az account show' in c for c in calls)
+        assert key == 'pk-custom'
+        assert any('/subscriptions/custom-sub-id/' in c for c in run_dispatcher.calls)
+        assert not any('az account show' in c for c in run_dispatcher.calls)
 
 
 # ------------------------------
@@ -539,31 +371,18 @@ def test_get_apim_subscription_key_uses_provided_subscription_id(monkeypatch):
 # ------------------------------
 
 
-def test_cleanup_old_jwt_signing_keys_success(monkeypatch):
+def test_cleanup_old_jwt_signing_keys_success(run_dispatcher):
     """Test successful cleanup of old JWT signing keys."""
 
-    run_calls: list[str] = []
-
-    def fake_run(cmd: str, *args, **kwargs):
-        run_calls.append(cmd)
-
-        if 'nv list' in cmd:
-            return Output(True, 'JwtSigningKey-sample-123\nJwtSigningKey-sample-456\n')
-
-        if 'nv delete' in cmd:
-            # Only the non-current key should be deleted
-            return Output(True, '')
-
-        return Output(False, 'unexpected command')
-
-    monkeypatch.setattr(az, 'run', fake_run)
-    suppress_module_functions(monkeypatch, az, ['print_message', 'print_info', 'print_ok', 'print_error'])
+    run_dispatcher.on('nv list', Output(True, 'JwtSigningKey-sample-123\nJwtSigningKey-sample-456\n'))
+    # Only the non-current key should be deleted
+    run_dispatcher.on('nv delete', Output(True, ''))
 
     result = az.cleanup_old_jwt_signing_keys('apim', 'rg', 'JwtSigningKey-sample-456')
 
     assert result is True
-    assert any('nv list' in c for c in run_calls)
-    delete_calls = [c for c in run_calls if 'nv delete' in c]
+    assert any('nv list' in c for c in run_dispatcher.calls)
+    delete_calls = [c for c in run_dispatcher.calls if 'nv delete' in c]
     assert len(delete_calls) == 1
     assert 'JwtSigningKey-sample-123' in delete_calls[0]
 
@@ -572,7 +391,6 @@ def test_cleanup_old_jwt_signing_keys_invalid_pattern(monkeypatch):
     """Test cleanup when current key name does not match expected pattern."""
 
     monkeypatch.setattr(az, 'run', lambda *a, **k: pytest.fail('run should not be called'))
-    suppress_module_functions(monkeypatch, az, ['print_message', 'print_info', 'print_ok'])
 
     result = az.cleanup_old_jwt_signing_keys('apim', 'rg', 'invalid-key-name')
 
@@ -584,57 +402,32 @@ def test_cleanup_old_jwt_signing_keys_invalid_pattern(monkeypatch):
 # ------------------------------
 
 
-def test_check_apim_blob_permissions_success(monkeypatch):
+def test_check_apim_blob_permissions_success(monkeypatch, run_dispatcher):
     """Test blob permission check succeeds when role assignment and access test succeed."""
 
     monkeypatch.setattr(az, 'get_azure_role_guid', lambda *_: 'role-guid')
-    suppress_module_functions(monkeypatch, az, ['print_info', 'print_ok', 'print_warning', 'print_error'])
 
-    run_calls: list[str] = []
-
-    def fake_run(cmd: str, *args, **kwargs):
-        run_calls.append(cmd)
-
-        if 'apim show' in cmd:
-            return Output(True, 'principal-id\n')
-
-        if 'storage account show' in cmd:
-            return Output(True, 'notice\n/subscriptions/123/resourceGroups/rg/providers/Microsoft.Storage/storageAccounts/storage\n')
-
-        if 'role assignment list' in cmd:
-            return Output(True, 'assignment-id\n')
-
-        if 'storage blob list' in cmd:
-            return Output(True, 'blob-name\n')
-
-        return Output(False, 'unexpected command')
-
-    monkeypatch.setattr(az, 'run', fake_run)
-    monkeypatch.setattr(az.time, 'sleep', lambda *a, **k: None)
+    run_dispatcher.on('apim show', Output(True, 'principal-id\n'))
+    run_dispatcher.on(
+        'storage account show', Output(True, 'notice\n/subscriptions/123/resourceGroups/rg/providers/Microsoft.Storage/storageAccounts/storage\n')
+    )
+    run_dispatcher.on('role assignment list', Output(True, 'assignment-id\n'))
+    run_dispatcher.on('storage blob list', Output(True, 'blob-name\n'))
 
     result = az.check_apim_blob_permissions('apim', 'storage', 'rg', max_wait_minutes=1)
 
     assert result is True
-    assert any('role assignment list' in c for c in run_calls)
-    assert any('storage blob list' in c for c in run_calls)
+    assert any('role assignment list' in c for c in run_dispatcher.calls)
+    assert any('storage blob list' in c for c in run_dispatcher.calls)
 
 
-def test_check_apim_blob_permissions_missing_resource_id(monkeypatch):
+def test_check_apim_blob_permissions_missing_resource_id(monkeypatch, run_dispatcher):
     """Test blob permission check fails when storage account ID cannot be parsed."""
 
     monkeypatch.setattr(az, 'get_azure_role_guid', lambda *_: 'role-guid')
-    suppress_module_functions(monkeypatch, az, ['print_info', 'print_ok', 'print_warning', 'print_error'])
-
-    def fake_run(cmd: str, *args, **kwargs):
-        if 'apim show' in cmd:
-            return Output(True, 'principal-id\n')
-
-        if 'storage account show' in cmd:
-            return Output(True, 'no matching id here')
-
-        return Output(False, 'unexpected command')
 
-    monkeypatch.setattr(az, 'run', fake_run)
+    run_dispatcher.on('apim show', Output(True, 'principal-id\n'))
+    run_dispatcher.on('storage account show', Output(True, 'no matching id here'))
 
     result = az.check_apim_blob_permissions('apim', 'storage', 'rg')
 
@@ -646,37 +439,30 @@ def test_check_apim_blob_permissions_missing_resource_id(monkeypatch):
 # ------------------------------
 
 
-@patch('azure_resources.time.time')
-@patch('azure_resources.os.path.basename')
-@patch('azure_resources.os.getcwd')
-def test_get_deployment_name_with_directory(mock_getcwd, mock_basename, mock_time):
+def test_get_deployment_name_with_directory(monkeypatch):
     """Test deployment name generation with explicit directory."""
 
-    mock_time.return_value = 1234567890
+    mock_getcwd = Mock(return_value='/path/to/current-folder')
+    monkeypatch.setattr(az.time, 'time', lambda: 1234567890)
+    monkeypatch.setattr(az.os, 'getcwd', mock_getcwd)
 
     result = az.get_deployment_name('my-sample')
 
     assert result == 'deploy-my-sample-1234567890'
     mock_getcwd.assert_not_called()
-    # Note: patching `os.path.basename` affects the shared `os.path` module, which is also
-    # used by stdlib logging internals. Avoid strict call-count assertions here.
 
 
-@patch('azure_resources.time.time')
-@patch('azure_resources.os.path.basename')
-@patch('azure_resources.os.getcwd')
-def test_get_deployment_name_current_directory(mock_getcwd, mock_basename, mock_time):
+def test_get_deployment_name_current_directory(monkeypatch):
     """Test deployment name generation using current directory."""
 
-    mock_time.return_value = 1234567890
-    mock_getcwd.return_value = '/path/to/current-folder'
-    mock_basename.return_value = 'current-folder'
+    mock_getcwd = Mock(return_value='/path/to/current-folder')
+    monkeypatch.setattr(az.time, 'time', lambda: 1234567890)
+    monkeypatch.setattr(az.os, 'getcwd', mock_getcwd)
 
     result = az.get_deployment_name()
 
     assert result == 'deploy-current-folder-1234567890'
     mock_getcwd.assert_called_once()
-    assert any(call_args.args == ('/path/to/current-folder',) for call_args in mock_basename.call_args_list)
 
 
 # ------------------------------
@@ -684,35 +470,28 @@ def test_get_deployment_name_current_directory(mock_getcwd, mock_basename, mock_
 # ------------------------------
 
 
-def test_get_frontdoor_url_afd_success():
+def test_get_frontdoor_url_afd_success(mock_run):
     """Test successful Front Door URL retrieval."""
 
-    with patch('azure_resources.run') as mock_run:
-        # Create mock outputs
-        profile_output = Output(True, '')
-        profile_output.json_data = [{'name': 'test-afd'}]
+    mock_run.side_effect = [_AFD_TEST_PROFILE, Output(True, 'test.azurefd.net\n')]
 
-        endpoint_output = Output(True, '')
-        endpoint_output.json_data = [{'hostName': 'test.azurefd.net'}]
+    result = az.get_frontdoor_url(INFRASTRUCTURE.AFD_APIM_PE, 'test-rg')
 
-        mock_run.side_effect = [profile_output, endpoint_output]
+    assert result == 'https://test.azurefd.net'
 
-        result = az.get_frontdoor_url(INFRASTRUCTURE.AFD_APIM_PE, 'test-rg')
+    assert [c.args[0] for c in mock_run.call_args_list] == [
+        'az afd profile list -g test-rg --query "[0].name" -o tsv',
+        'az afd endpoint list -g test-rg --profile-name test-afd --query "[0].hostName" -o tsv',
+    ]
 
-        assert result == 'https://test.azurefd.net'
 
-        expected_calls = [call('az afd profile list -g test-rg -o json'), call('az afd endpoint list -g test-rg --profile-name test-afd -o json')]
-        mock_run.assert_has_calls(expected_calls)
-
-
-def test_get_frontdoor_url_wrong_infrastructure():
+def test_get_frontdoor_url_wrong_infrastructure(mock_run):
     """Test Front Door URL with wrong infrastructure type."""
 
-    with patch('azure_resources.run') as mock_run:
-        result = az.get_frontdoor_url(INFRASTRUCTURE.SIMPLE_APIM, 'test-rg')
+    result = az.get_frontdoor_url(INFRASTRUCTURE.SIMPLE_APIM, 'test-rg')
 
-        assert result is None
-        mock_run.assert_not_called()
+    assert result is None
+    mock_run.assert_not_called()
 
 
 def test_get_frontdoor_url_no_warning_for_non_afd(monkeypatch):
@@ -726,29 +505,20 @@ def test_get_frontdoor_url_no_warning_for_non_afd(monkeypatch):
         assert not any('No Front Door' in w for w in warnings), f'Unexpected warning for {infra}: {warnings}'
 
 
-def test_get_frontdoor_url_no_profile():
-    """Test Front Door URL when no profile found."""
-
-    with patch('azure_resources.run') as mock_run:
-        mock_run.return_value = Output(False, 'No profiles found')
-
-        result = az.get_frontdoor_url(INFRASTRUCTURE.AFD_APIM_PE, 'test-rg')
-
-        assert result is None
-
-
-def test_get_frontdoor_url_no_endpoints():
-    """Test Front Door URL when profile exists but no endpoints."""
-
-    with patch('azure_resources.run') as mock_run:
-        profile_output = Output(True, '')
-        profile_output.json_data = [{'name': 'test-afd'}]
-        endpoint_output = Output(False, 'No endpoints found')
-        mock_run.side_effect = [profile_output, endpoint_output]
+@pytest.mark.parametrize(
+    'outputs',
+    [
+        pytest.param([Output(False, 'No profiles found')], id='no_profile'),
+        pytest.param([_AFD_TEST_PROFILE, Output(False, 'No endpoints found')], id='no_endpoints'),
+        pytest.param([_AFD_TEST_PROFILE, Output(True, '')], id='empty_endpoint_list'),
+    ],
+)
+def test_get_frontdoor_url_not_resolved(monkeypatch, outputs):
+    """Test Front Door URL is None when the profile or its endpoints cannot be resolved."""
 
-        result = az.get_frontdoor_url(INFRASTRUCTURE.AFD_APIM_PE, 'test-rg')
+    patch_run_sequence(monkeypatch, az, outputs)
 
-        assert result is None
+    assert az.get_frontdoor_url(INFRASTRUCTURE.AFD_APIM_PE, 'test-rg') is None
 
 
 # ------------------------------
@@ -756,40 +526,34 @@ def test_get_frontdoor_url_no_endpoints():
 # ------------------------------
 
 
-def test_get_apim_url_success():
+def test_get_apim_url_success(mock_run):
     """Test successful APIM URL retrieval."""
 
-    with patch('azure_resources.run') as mock_run:
-        mock_run.return_value = Output(True, '')
-        mock_run.return_value.json_data = [{'name': 'test-apim', 'gatewayUrl': 'https://test-apim.azure-api.net'}]
-
-        result = az.get_apim_url('test-rg')
-
-        assert result == 'https://test-apim.azure-api.net'
-        mock_run.assert_called_once_with('az apim list -g test-rg -o json')
+    # What `az ... --query "[0].[[name, gatewayUrl]]" -o tsv` prints: the single inner list as one tab-separated row
+    mock_run.return_value = Output(True, 'test-apim\thttps://test-apim.azure-api.net\n')
 
+    result = az.get_apim_url('test-rg')
 
-def test_get_apim_url_failure():
-    """Test APIM URL retrieval failure."""
+    assert result == 'https://test-apim.azure-api.net'
+    assert mock_run.call_count == 1
+    assert mock_run.call_args.args[0] == 'az apim list -g test-rg --query "[0].[[name, gatewayUrl]]" -o tsv'
 
-    with patch('azure_resources.run') as mock_run:
-        mock_run.return_value = Output(False, 'No APIM services found')
 
-        result = az.get_apim_url('test-rg')
+@pytest.mark.parametrize(
+    'output, expected',
+    [
+        pytest.param(Output(False, 'No APIM services found'), None, id='failure'),
+        # tsv renders a null gatewayUrl as an empty column
+        pytest.param(Output(True, 'test-apim\t\n'), None, id='no_gateway'),
+        pytest.param(Output(True, ''), None, id='no_services'),
+    ],
+)
+def test_get_apim_url_results(mock_run, output, expected):
+    """Test APIM URL retrieval across failed, gateway-less and empty responses."""
 
-        assert result is None
+    mock_run.return_value = output
 
-
-def test_get_apim_url_no_gateway():
-    """Test APIM URL when service exists but no gateway URL."""
-
-    with patch('azure_resources.run') as mock_run:
-        mock_run.return_value = Output(True, '')
-        mock_run.return_value.json_data = [{'name': 'test-apim', 'gatewayUrl': None}]
-
-        result = az.get_apim_url('test-rg')
-
-        assert result is None
+    assert az.get_apim_url('test-rg') == expected
 
 
 # ------------------------------
@@ -797,59 +561,47 @@ def test_get_apim_url_no_gateway():
 # ------------------------------
 
 
-def test_get_appgw_endpoint_success():
-    """Test successful Application Gateway endpoint retrieval."""
+_APPGW_PIP_ID = '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Network/publicIPAddresses/test-pip'
 
-    with patch('azure_resources.run') as mock_run:
-        appgw_output = Output(True, '')
-        appgw_output.json_data = [
-            {
-                'name': 'test-appgw',
-                'httpListeners': [{'hostName': 'api.contoso.com'}],
-                'frontendIPConfigurations': [
-                    {'publicIPAddress': {'id': '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Network/publicIPAddresses/test-pip'}}
-                ],
-            }
-        ]
-        ip_output = Output(True, '')
-        ip_output.json_data = {'ipAddress': '1.2.3.4'}
-        mock_run.side_effect = [appgw_output, ip_output]
 
-        hostname, ip = az.get_appgw_endpoint('test-rg')
+def test_get_appgw_endpoint_success(mock_run):
+    """Test successful Application Gateway endpoint retrieval."""
 
-        assert hostname == 'api.contoso.com'
-        assert ip == '1.2.3.4'
+    appgw_output = create_mock_output(json_data={'name': 'test-appgw', 'hostNames': ['api.contoso.com'], 'publicIpIds': [_APPGW_PIP_ID]})
+    mock_run.side_effect = [appgw_output, Output(True, '1.2.3.4\n')]
 
-        expected_calls = [
-            call('az network application-gateway list -g test-rg -o json'),
-            call('az network public-ip show -g test-rg -n test-pip -o json'),
-        ]
-        mock_run.assert_has_calls(expected_calls)
+    hostname, ip = az.get_appgw_endpoint('test-rg')
 
+    assert hostname == 'api.contoso.com'
+    assert ip == '1.2.3.4'
 
-def test_get_appgw_endpoint_no_gateway():
-    """Test Application Gateway endpoint when no gateway found."""
+    commands = [c.args[0] for c in mock_run.call_args_list]
+    assert commands[0].startswith('az network application-gateway list -g test-rg --query "[0].{')
+    assert commands[1] == f'az network public-ip show --ids {_APPGW_PIP_ID} --query ipAddress -o tsv'
 
-    with patch('azure_resources.run') as mock_run:
-        mock_run.return_value = Output(False, 'No gateways found')
 
-        hostname, ip = az.get_appgw_endpoint('test-rg')
+@pytest.mark.parametrize(
+    'outputs, expected',
+    [
+        pytest.param([Output(False, 'No gateways found')], (None, None), id='no_gateway'),
+        pytest.param([Output(True, '')], (None, None), id='empty_gateway_list'),
+        pytest.param([create_mock_output(json_data={'name': 'test-appgw', 'hostNames': [], 'publicIpIds': []})], (None, None), id='no_listeners'),
+        pytest.param(
+            [
+                create_mock_output(json_data={'name': 'test-appgw', 'hostNames': ['api.contoso.com'], 'publicIpIds': [_APPGW_PIP_ID]}),
+                Output(False, 'IP not found'),
+            ],
+            ('api.contoso.com', None),
+            id='no_public_ip',
+        ),
+    ],
+)
+def test_get_appgw_endpoint_partial_results(monkeypatch, outputs, expected):
+    """Test Application Gateway endpoint when the gateway, listeners or public IP are missing."""
 
-        assert hostname is None
-        assert ip is None
+    patch_run_sequence(monkeypatch, az, outputs)
 
-
-def test_get_appgw_endpoint_no_listeners():
-    """Test Application Gateway endpoint with no HTTP listeners."""
-
-    with patch('azure_resources.run') as mock_run:
-        mock_run.return_value = Output(True, '')
-        mock_run.return_value.json_data = [{'name': 'test-appgw', 'httpListeners': [], 'frontendIPConfigurations': []}]
-
-        hostname, ip = az.get_appgw_endpoint('test-rg')
-
-        assert hostname is None
-        assert ip is None
+    assert az.get_appgw_endpoint('test-rg') == expected
 
 
 # ------------------------------
@@ -894,45 +646,34 @@ def test_get_rg_name_with_index():
 # ------------------------------
 
 
-@patch('azure_resources.tempfile.NamedTemporaryFile')
-@patch('azure_resources.time.time')
-@patch('azure_resources.os.unlink')
-def test_get_unique_suffix_for_resource_group_success(mock_unlink, mock_time, mock_tempfile):
-    """Test successful unique suffix retrieval."""
+def test_get_unique_suffix_for_resource_group_success(monkeypatch, mock_run):
+    """Test successful unique suffix retrieval from the shipped template."""
 
-    mock_time.return_value = 1234567890
-    mock_file = Mock()
-    mock_file.name = '/tmp/template.json'
-    mock_tempfile.return_value.__enter__.return_value = mock_file
+    monkeypatch.setattr(az.time, 'time', lambda: 1234567890)
+    mock_run.return_value = Output(True, 'abc123def456\n')
 
-    with patch('azure_resources.run') as mock_run:
-        mock_run.return_value = Output(True, 'abc123def456\n')
+    result = az.get_unique_suffix_for_resource_group('test-rg')
 
-        result = az.get_unique_suffix_for_resource_group('test-rg')
+    assert result == 'abc123def456'
+    mock_run.assert_called_once()
 
-        assert result == 'abc123def456'
-        mock_run.assert_called_once()
-        mock_unlink.assert_called_once_with('/tmp/template.json')
+    command = mock_run.call_args.args[0]
+    assert command.startswith('az deployment group create --name get-suffix-1234567890 --resource-group test-rg')
 
+    template_path = command.split('--template-file "', 1)[1].split('"', 1)[0]
+    with open(template_path, encoding='utf-8') as f:
+        template = json.load(f)
+    assert template['outputs']['suffix']['value'] == '[uniqueString(subscription().id, resourceGroup().id)]'
 
-@patch('azure_resources.tempfile.NamedTemporaryFile')
-@patch('azure_resources.time.time')
-@patch('azure_resources.os.unlink')
-def test_get_unique_suffix_for_resource_group_failure(mock_unlink, mock_time, mock_tempfile):
-    """Test unique suffix retrieval failure."""
 
-    mock_time.return_value = 1234567890
-    mock_file = Mock()
-    mock_file.name = '/tmp/template.json'
-    mock_tempfile.return_value.__enter__.return_value = mock_file
+def test_get_unique_suffix_for_resource_group_failure(monkeypatch):
+    """Test unique suffix retrieval failure."""
 
-    with patch('azure_resources.run') as mock_run:
-        mock_run.return_value = Output(False, 'Deployment failed')
+    monkeypatch.setattr(az, 'run', Mock(return_value=Output(False, 'Deployment failed')))
 
-        result = az.get_unique_suffix_for_resource_group('test-rg')
+    result = az.get_unique_suffix_for_resource_group('test-rg')
 
-        assert not result
-        mock_unlink.assert_called_once_with('/tmp/template.json')
+    assert not result
 
 
 # ------------------------------
@@ -940,15 +681,15 @@ def test_get_unique_suffix_for_resource_group_failure(mock_unlink, mock_time, mo
 # ------------------------------
 
 
-@patch('azure_resources.get_frontdoor_url')
-@patch('azure_resources.get_apim_url')
-@patch('azure_resources.get_appgw_endpoint')
-def test_get_endpoints_success(mock_appgw, mock_apim, mock_afd):
+def test_get_endpoints_success(monkeypatch):
     """Test successful endpoints retrieval."""
 
-    mock_afd.return_value = 'https://test.azurefd.net'
-    mock_apim.return_value = 'https://test-apim.azure-api.net'
-    mock_appgw.return_value = ('api.contoso.com', '1.2.3.4')
+    mock_afd = Mock(return_value='https://test.azurefd.net')
+    mock_apim = Mock(return_value='https://test-apim.azure-api.net')
+    mock_appgw = Mock(return_value=('api.contoso.com', '1.2.3.4'))
+    monkeypatch.setattr(az, 'get_frontdoor_url', mock_afd)
+    monkeypatch.setattr(az, 'get_apim_url', mock_apim)
+    monkeypatch.setattr(az, 'get_appgw_endpoint', mock_appgw)
 
     result = az.get_endpoints(INFRASTRUCTURE.AFD_APIM_PE, 'test-rg')
 
@@ -971,10 +712,7 @@ def test_get_endpoints_success(mock_appgw, mock_apim, mock_afd):
 def test_run_with_debug_flag_injection(monkeypatch):
     """Test that --debug flag is injected when logging is in DEBUG level."""
 
-    mock_process = Mock()
-    mock_process.returncode = 0
-    mock_process.stdout = 'test output'
-    mock_process.stderr = ''
+    mock_process = SimpleNamespace(returncode=0, stdout='test output', stderr='')
 
     monkeypatch.setattr('subprocess.run', lambda *a, **k: mock_process)
 
@@ -982,104 +720,42 @@ def test_run_with_debug_flag_injection(monkeypatch):
     # Verify run method works without errors
 
 
-def test_get_resource_group_location_with_whitespace(monkeypatch):
+def test_get_resource_group_location_with_whitespace(mock_run):
     """Test get_resource_group_location handles whitespace in response."""
-    with patch('azure_resources.run') as mock_run:
-        mock_run.return_value = Output(True, '  eastus  \n')
+    mock_run.return_value = Output(True, '  eastus  \n')
 
-        result = az.get_resource_group_location('test-rg')
-        assert result == 'eastus'
+    result = az.get_resource_group_location('test-rg')
+    assert result == 'eastus'
 
 
 def test_get_account_info_missing_user_id(monkeypatch):
     """Test get_account_info when user ID is not available."""
-    with patch('azure_resources.run') as mock_run:
-        account_output = _create_account_output()
+    account_output = _create_account_output()
 
-        ad_user_output = Output(False, 'User not found')
-        mock_run.side_effect = [account_output, ad_user_output]
+    ad_user_output = Output(False, 'User not found')
+    patch_run_sequence(monkeypatch, az, [account_output, ad_user_output])
 
-        with pytest.raises(Exception):
-            az.get_account_info()
+    with pytest.raises(Exception):
+        az.get_account_info()
 
 
 def test_cleanup_old_jwt_signing_keys_no_matching_pattern(monkeypatch):
     """Test cleanup_old_jwt_signing_keys with non-matching key pattern."""
-    suppress_module_functions(monkeypatch, az, ['print_message', 'print_info', 'print_ok'])
 
     result = az.cleanup_old_jwt_signing_keys('apim', 'rg', 'InvalidKeyPattern-123')
     assert result is False
 
 
-def test_cleanup_old_jwt_signing_keys_all_deleted(monkeypatch):
+def test_cleanup_old_jwt_signing_keys_all_deleted(run_dispatcher):
     """Test cleanup_old_jwt_signing_keys when all old keys are successfully deleted."""
-    run_calls = []
 
-    def fake_run(cmd, *args, **kwargs):
-        run_calls.append(cmd)
-        if 'nv list' in cmd:
-            return Output(True, 'JwtSigningKey-sample-123\nJwtSigningKey-sample-67890\n')
-        if 'nv delete' in cmd:
-            return Output(True, 'Deleted')
-        return Output(False, 'Unknown')
-
-    monkeypatch.setattr('azure_resources.run', fake_run)
-    suppress_module_functions(monkeypatch, az, ['print_message', 'print_info', 'print_ok', 'print_error'])
+    run_dispatcher.on('nv list', Output(True, 'JwtSigningKey-sample-123\nJwtSigningKey-sample-67890\n'))
+    run_dispatcher.on('nv delete', Output(True, 'Deleted'))
 
     result = az.cleanup_old_jwt_signing_keys('apim', 'rg', 'JwtSigningKey-sample-99999')
     assert result is True
 
 
-def test_get_frontdoor_url_no_hostname(monkeypatch):
-    """Test get_frontdoor_url when endpoint has no hostname."""
-    with patch('azure_resources.run') as mock_run:
-        profile_output = Output(True, '')
-        profile_output.json_data = [{'name': 'test-afd'}]
-
-        endpoint_output = Output(True, '')
-        endpoint_output.json_data = []  # Empty endpoint list
-
-        mock_run.side_effect = [profile_output, endpoint_output]
-
-        result = az.get_frontdoor_url(INFRASTRUCTURE.AFD_APIM_PE, 'test-rg')
-        assert result is None
-
-
-def test_get_apim_url_multiple_services(monkeypatch):
-    """Test get_apim_url returns first service when multiple exist."""
-    with patch('azure_resources.run') as mock_run:
-        mock_run.return_value = Output(True, '')
-        mock_run.return_value.json_data = [
-            {'name': 'apim-1', 'gatewayUrl': 'https://apim-1.azure-api.net'},
-            {'name': 'apim-2', 'gatewayUrl': 'https://apim-2.azure-api.net'},
-        ]
-
-        result = az.get_apim_url('test-rg')
-        assert result == 'https://apim-1.azure-api.net'
-
-
-def test_get_appgw_endpoint_no_public_ip(monkeypatch):
-    """Test get_appgw_endpoint when public IP retrieval fails."""
-    with patch('azure_resources.run') as mock_run:
-        appgw_output = Output(True, '')
-        appgw_output.json_data = [
-            {
-                'name': 'test-appgw',
-                'httpListeners': [{'hostName': 'api.contoso.com'}],
-                'frontendIPConfigurations': [
-                    {'publicIPAddress': {'id': '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Network/publicIPAddresses/pip'}}
-                ],
-            }
-        ]
-
-        ip_output = Output(False, 'IP not found')
-        mock_run.side_effect = [appgw_output, ip_output]
-
-        hostname, ip = az.get_appgw_endpoint('test-rg')
-        assert hostname == 'api.contoso.com'
-        assert ip is None
-
-
 def test_get_infra_rg_name_with_zero_index(monkeypatch):
     """Test get_infra_rg_name with zero index."""
     result = az.get_infra_rg_name(INFRASTRUCTURE.SIMPLE_APIM, 0)
@@ -1101,23 +777,20 @@ def test_get_rg_name_with_zero_index(monkeypatch):
 def test_get_deployment_name_different_samples(monkeypatch):
     """Test get_deployment_name with different sample names."""
 
-    with patch('azure_resources.time.time', return_value=1000):
-        with patch('azure_resources.os.getcwd', return_value='/path/to/sample-1'):
-            with patch('azure_resources.os.path.basename', return_value='sample-1'):
-                result = az.get_deployment_name('my-custom-sample')
-                assert 'my-custom-sample' in result
-                assert '1000' in result
+    mock_getcwd = Mock(return_value='/path/to/sample-1')
+    monkeypatch.setattr(az.time, 'time', lambda: 1000)
+    monkeypatch.setattr(az.os, 'getcwd', mock_getcwd)
 
+    result = az.get_deployment_name('my-custom-sample')
 
-def test_find_infrastructure_instances_multiple_indexes(monkeypatch):
-    """Test find_infrastructure_instances with multiple indexes."""
+    assert result == 'deploy-my-custom-sample-1000'
+    mock_getcwd.assert_not_called()
 
-    def fake_run(cmd, *args, **kwargs):
-        if 'apim-aca' in cmd:
-            return Output(True, 'apim-infra-apim-aca-1\napim-infra-apim-aca-2\napim-infra-apim-aca-3\n')
-        return Output(False, '')
 
-    monkeypatch.setattr('azure_resources.run', fake_run)
+def test_find_infrastructure_instances_multiple_indexes(run_dispatcher):
+    """Test find_infrastructure_instances with multiple indexes."""
+
+    run_dispatcher.on('apim-aca', Output(True, 'apim-infra-apim-aca-1\napim-infra-apim-aca-2\napim-infra-apim-aca-3\n'))
 
     result = az.find_infrastructure_instances(INFRASTRUCTURE.APIM_ACA)
     assert len(result) == 3
@@ -1138,6 +811,24 @@ def test_find_infrastructure_instances_invalid_format(monkeypatch):
     assert not result
 
 
+def test_find_infrastructure_instances_ignores_longer_infrastructure_names(run_dispatcher):
+    """Test that another infrastructure sharing the prefix (appgw-apim vs appgw-apim-pe) is not mistaken for an index."""
+
+    run_dispatcher.on(
+        'az group list', Output(True, 'apim-infra-appgw-apim\napim-infra-appgw-apim-pe\napim-infra-appgw-apim-pe-2\napim-infra-appgw-apim-3\n')
+    )
+
+    assert az.find_infrastructure_instances(INFRASTRUCTURE.APPGW_APIM) == [(INFRASTRUCTURE.APPGW_APIM, None), (INFRASTRUCTURE.APPGW_APIM, 3)]
+
+
+def test_find_infrastructure_instances_tolerates_padded_and_crlf_lines(run_dispatcher):
+    """Test that surrounding whitespace and CRLF line endings do not hide matching resource group names."""
+
+    run_dispatcher.on('az group list', Output(True, '  apim-infra-simple-apim-1\r\n\tapim-infra-simple-apim \r\nnot-apim-infra-simple-apim-4\r\n'))
+
+    assert az.find_infrastructure_instances(INFRASTRUCTURE.SIMPLE_APIM) == [(INFRASTRUCTURE.SIMPLE_APIM, 1), (INFRASTRUCTURE.SIMPLE_APIM, None)]
+
+
 # ------------------------------
 #    COMMAND STRING GENERATION TESTS
 # ------------------------------
@@ -1150,10 +841,7 @@ def test_run_command_building_with_output_format(monkeypatch):
 
     def capture_command(*args, **kwargs):
         called_commands.append(args[0])
-        mock_process = Mock()
-        mock_process.returncode = 0
-        mock_process.stdout = 'output'
-        mock_process.stderr = ''
+        mock_process = SimpleNamespace(returncode=0, stdout='output', stderr='')
         return mock_process
 
     monkeypatch.setattr('subprocess.run', capture_command)
@@ -1165,17 +853,11 @@ def test_run_command_building_with_output_format(monkeypatch):
 
 def test_get_unique_suffix_with_empty_rg_list(monkeypatch):
     """Test get_unique_suffix_for_resource_group with empty list response."""
-    with patch('azure_resources.tempfile.NamedTemporaryFile') as mock_tempfile:
-        mock_file = Mock()
-        mock_file.name = '/tmp/template.json'
-        mock_tempfile.return_value.__enter__.return_value = mock_file
 
-        with patch('azure_resources.run') as mock_run:
-            mock_run.return_value = Output(False, 'No resources found')
+    monkeypatch.setattr(az, 'run', Mock(return_value=Output(False, 'No resources found')))
 
-            with patch('azure_resources.os.unlink'):
-                result = az.get_unique_suffix_for_resource_group('test-rg')
-                assert not result
+    result = az.get_unique_suffix_for_resource_group('test-rg')
+    assert not result
 
 
 # ------------------------------
@@ -1185,26 +867,26 @@ def test_get_unique_suffix_with_empty_rg_list(monkeypatch):
 
 def test_get_endpoints_with_partial_data(monkeypatch):
     """Test get_endpoints when some endpoints are missing."""
-    with patch('azure_resources.get_frontdoor_url', return_value=None):
-        with patch('azure_resources.get_apim_url', return_value='https://test-apim.azure-api.net'):
-            with patch('azure_resources.get_appgw_endpoint', return_value=(None, None)):
-                result = az.get_endpoints(INFRASTRUCTURE.SIMPLE_APIM, 'test-rg')
+    monkeypatch.setattr(az, 'get_frontdoor_url', lambda *_: None)
+    monkeypatch.setattr(az, 'get_apim_url', lambda *_: 'https://test-apim.azure-api.net')
+    monkeypatch.setattr(az, 'get_appgw_endpoint', lambda *_: (None, None))
 
-                assert isinstance(result, Endpoints)
-                assert result.afd_endpoint_url is None
-                assert result.apim_endpoint_url == 'https://test-apim.azure-api.net'
-                assert result.appgw_hostname is None
-                assert result.appgw_public_ip is None
+    result = az.get_endpoints(INFRASTRUCTURE.SIMPLE_APIM, 'test-rg')
 
+    assert isinstance(result, Endpoints)
+    assert result.afd_endpoint_url is None
+    assert result.apim_endpoint_url == 'https://test-apim.azure-api.net'
+    assert result.appgw_hostname is None
+    assert result.appgw_public_ip is None
 
-def test_does_resource_group_exist_with_malformed_response(monkeypatch):
+
+def test_does_resource_group_exist_with_malformed_response(mock_run):
     """Test does_resource_group_exist with unexpected response from az group exists."""
-    with patch('azure_resources.run') as mock_run:
-        mock_run.return_value = Output(True, '{invalid}')
+    mock_run.return_value = Output(True, '{invalid}')
 
-        result = az.does_resource_group_exist('test-rg')
-        # Should return False because response is not 'true'
-        assert result is False
+    result = az.does_resource_group_exist('test-rg')
+    # Should return False because response is not 'true'
+    assert result is False
 
 
 def test_create_resource_group_with_empty_tags(monkeypatch):
@@ -1263,142 +945,99 @@ def test_create_resource_group_noops_when_resource_group_already_exists(monkeypa
 
 def test_get_azure_role_guid_with_multiple_roles(monkeypatch):
     """Test get_azure_role_guid retrieval from file with multiple roles."""
-    mock_data = {
-        'Owner': 'role-owner',
-        'Contributor': 'role-contrib',
-        'Reader': 'role-reader',
-        'Storage Blob Data Reader': 'role-storage-reader',
-        'Storage Account Contributor': 'role-storage-contrib',
-        'Key Vault Administrator': 'role-kv-admin',
-    }
-
-    with patch('builtins.open', mock_open(read_data=json.dumps(mock_data))):
-        for role_name, expected_guid in mock_data.items():
-            result = az.get_azure_role_guid(role_name)
-            assert result == expected_guid
-
-
-def test_check_apim_blob_permissions_no_principal_id(monkeypatch):
-    """Test check_apim_blob_permissions when APIM has no principal ID."""
 
-    def fake_run(cmd, *args, **kwargs):
-        if 'apim show' in cmd:
-            return Output(True, '')  # No principal ID
-        return Output(False, 'Error')
+    monkeypatch.setattr(az, 'open', lambda *_, **__: io.StringIO(_ROLE_GUIDS_JSON), raising=False)
+
+    for role_name, expected_guid in _ROLE_GUIDS.items():
+        result = az.get_azure_role_guid(role_name)
+        assert result == expected_guid
 
-    monkeypatch.setattr('azure_resources.run', fake_run)
-    suppress_module_functions(monkeypatch, az, ['print_info', 'print_ok', 'print_warning', 'print_error'])
+
+def test_check_apim_blob_permissions_no_principal_id(run_dispatcher):
+    """Test check_apim_blob_permissions when APIM has no principal ID."""
+
+    run_dispatcher.on('apim show', Output(True, ''))  # No principal ID
 
     result = az.check_apim_blob_permissions('apim', 'storage', 'rg')
     assert result is False
 
 
-def test_check_apim_blob_permissions_timeout_waiting_for_propagation(monkeypatch):
+def test_check_apim_blob_permissions_timeout_waiting_for_propagation(monkeypatch, run_dispatcher):
     """Test blob permission check times out when waiting for role assignment propagation."""
 
-    def fake_run(cmd, *args, **kwargs):
-        if 'apim show' in cmd:
-            return Output(True, 'principal-id\n')
-        if 'storage account show' in cmd:
-            return Output(True, '/subscriptions/123/resourceGroups/rg/providers/Microsoft.Storage/storageAccounts/storage\n')
-        if 'role assignment list' in cmd:
-            # Never return a role assignment (timeout scenario)
-            return Output(True, '')
-        return Output(False, 'unexpected')
-
-    monkeypatch.setattr(az, 'run', fake_run)
+    run_dispatcher.on('apim show', Output(True, 'principal-id\n'))
+    run_dispatcher.on(
+        'storage account show', Output(True, '/subscriptions/123/resourceGroups/rg/providers/Microsoft.Storage/storageAccounts/storage\n')
+    )
+    # Never return a role assignment (timeout scenario)
+    run_dispatcher.on('role assignment list', Output(True, ''))
     monkeypatch.setattr(az, 'get_azure_role_guid', lambda *_: 'role-guid')
-    monkeypatch.setattr(az.time, 'sleep', lambda *a, **k: None)
-    suppress_module_functions(monkeypatch, az, ['print_info', 'print_ok', 'print_warning', 'print_error'])
 
     result = az.check_apim_blob_permissions('apim', 'storage', 'rg', max_wait_minutes=1)
     assert result is False
 
 
-def test_check_apim_blob_permissions_storage_account_retrieval_fails(monkeypatch):
+def test_check_apim_blob_permissions_storage_account_retrieval_fails(monkeypatch, run_dispatcher):
     """Test blob permission check fails when storage account retrieval fails."""
 
-    def fake_run(cmd, *args, **kwargs):
-        if 'apim show' in cmd:
-            return Output(True, 'principal-id\n')
-        if 'storage account show' in cmd:
-            return Output(False, 'Error retrieving account')
-        return Output(False, 'unexpected')
-
-    monkeypatch.setattr(az, 'run', fake_run)
+    run_dispatcher.on('apim show', Output(True, 'principal-id\n'))
+    run_dispatcher.on('storage account show', Output(False, 'Error retrieving account'))
     monkeypatch.setattr(az, 'get_azure_role_guid', lambda *_: 'role-guid')
-    suppress_module_functions(monkeypatch, az, ['print_info', 'print_ok', 'print_warning', 'print_error'])
 
     result = az.check_apim_blob_permissions('apim', 'storage', 'rg')
     assert result is False
 
 
-def test_check_apim_blob_permissions_role_assignment_exists_but_blob_access_fails(monkeypatch):
+def test_check_apim_blob_permissions_role_assignment_exists_but_blob_access_fails(monkeypatch, run_dispatcher):
     """Test when role assignment exists but blob access test fails."""
 
-    def fake_run(cmd, *args, **kwargs):
-        if 'apim show' in cmd:
-            return Output(True, 'principal-id\n')
-        if 'storage account show' in cmd:
-            return Output(True, '/subscriptions/123/resourceGroups/rg/providers/Microsoft.Storage/storageAccounts/storage\n')
-        if 'role assignment list' in cmd:
-            return Output(True, 'assignment-id\n')
-        if 'storage blob list' in cmd:
-            return Output(True, 'access-test-failed')
-        return Output(False, 'unexpected')
-
-    monkeypatch.setattr(az, 'run', fake_run)
+    run_dispatcher.on('apim show', Output(True, 'principal-id\n'))
+    run_dispatcher.on(
+        'storage account show', Output(True, '/subscriptions/123/resourceGroups/rg/providers/Microsoft.Storage/storageAccounts/storage\n')
+    )
+    run_dispatcher.on('role assignment list', Output(True, 'assignment-id\n'))
+    run_dispatcher.on('storage blob list', Output(True, 'access-test-failed'))
     monkeypatch.setattr(az, 'get_azure_role_guid', lambda *_: 'role-guid')
-    monkeypatch.setattr(az.time, 'sleep', lambda *a, **k: None)
-    suppress_module_functions(monkeypatch, az, ['print_info', 'print_ok', 'print_warning', 'print_error'])
 
     result = az.check_apim_blob_permissions('apim', 'storage', 'rg', max_wait_minutes=1)
     assert result is False
 
 
-def test_check_apim_blob_permissions_custom_wait_time(monkeypatch):
+def test_check_apim_blob_permissions_custom_wait_time(monkeypatch, run_dispatcher):
     """Test blob permission check with custom max_wait_minutes parameter."""
     call_times = []
 
     def fake_sleep(seconds):
         call_times.append(seconds)
 
-    def fake_run(cmd, *args, **kwargs):
-        if 'apim show' in cmd:
-            return Output(True, 'principal-id\n')
-        if 'storage account show' in cmd:
-            return Output(True, '/subscriptions/123/resourceGroups/rg/providers/Microsoft.Storage/storageAccounts/storage\n')
-        if 'role assignment list' in cmd:
-            return Output(True, '')  # Never find it, trigger timeout
-        return Output(False, 'unexpected')
-
-    monkeypatch.setattr(az, 'run', fake_run)
+    run_dispatcher.on('apim show', Output(True, 'principal-id\n'))
+    run_dispatcher.on(
+        'storage account show', Output(True, '/subscriptions/123/resourceGroups/rg/providers/Microsoft.Storage/storageAccounts/storage\n')
+    )
+    run_dispatcher.on('role assignment list', Output(True, ''))  # Never find it, trigger timeout
     monkeypatch.setattr(az, 'get_azure_role_guid', lambda *_: 'role-guid')
     monkeypatch.setattr(az.time, 'sleep', fake_sleep)
-    suppress_module_functions(monkeypatch, az, ['print_info', 'print_ok', 'print_warning', 'print_error'])
+    monkeypatch.setattr(az.random, 'uniform', lambda low, high: high)  # Maximum +20% jitter
 
     result = az.check_apim_blob_permissions('apim', 'storage', 'rg', max_wait_minutes=2)
     assert result is False
-    # Verify sleep was called with correct interval
-    assert all(seconds == 30 for seconds in call_times)
+    # Verify the polling backs off from a short first wait to the 30s cap, with jitter applied on top of the cap
+    expected_base = [2, 3.2, 5.12, 8.192, 13.1072, 20.97152, 30]
+    assert call_times == pytest.approx([base * 1.2 for base in expected_base])
+    assert sum(call_times) <= 2 * 60
 
 
 def test_get_account_info_all_fields_present(monkeypatch):
     """Test get_account_info successfully retrieves all account information."""
-    with patch('azure_resources.run') as mock_run:
-        account_output = _create_account_output()
-
-        ad_user_output = Output(True, '{}')
-        ad_user_output.json_data = {'id': 'user-id-xyz'}
 
-        mock_run.side_effect = [account_output, ad_user_output]
+    patch_run_sequence(monkeypatch, az, (_create_account_output(), Output(True, '{"id": "user-id-xyz"}')))
 
-        user, user_id, tenant_id, subscription_id = az.get_account_info()
+    user, user_id, tenant_id, subscription_id = az.get_account_info()
 
-        assert user == 'test.user@example.com'
-        assert user_id == 'user-id-xyz'
-        assert tenant_id == 'tenant-123'
-        assert subscription_id == 'sub-123'
+    assert user == 'test.user@example.com'
+    assert user_id == 'user-id-xyz'
+    assert tenant_id == 'tenant-123'
+    assert subscription_id == 'sub-123'
 
 
 # ------------------------------
@@ -1444,48 +1083,93 @@ def test_redact_secrets_with_empty_string():
     assert az._redact_secrets(None) is None
 
 
-def test_maybe_add_az_debug_flag_when_debug_enabled():
+@pytest.mark.parametrize(
+    'text',
+    [
+        '{"PRIMARYKEY": "s3cr3t"}',
+        '{"secondaryKey": "s3cr3t"}',
+        '{"primarySharedKey": "s3cr3t"}',
+        '{"secondarySharedKey": "s3cr3t"}',
+        '{"connectionString": "s3cr3t"}',
+        'DefaultEndpointsProtocol=https;AccountKey=s3cr3t;',
+        'SharedAccessSignature=s3cr3t;',
+        'Api-Key: s3cr3t',
+    ],
+)
+def test_redact_secrets_hints_cover_every_pattern(text):
+    """Test that the cheap hint pre-check never skips text one of the redaction patterns would match."""
+    assert 's3cr3t' not in az._redact_secrets(text)
+
+
+def test_redact_secrets_redacts_every_field_in_mixed_output():
+    """Test that the fused patterns redact all secrets in one payload while keeping the field names."""
+    text = (
+        '{"accessToken": "t1", "primaryKey": "k1", "connectionString": "c1"}\n'
+        'Endpoint=sb://ns;SharedAccessSignature=sig1;AccountKey=k2;\n'
+        'Authorization: Bearer t2\napi-key: k3'
+    )
+
+    result = az._redact_secrets(text)
+
+    assert result == (
+        '{"accessToken": "***REDACTED***", "primaryKey": "***REDACTED***", "connectionString": "***REDACTED***"}\n'
+        'Endpoint=sb://ns;SharedAccessSignature=***REDACTED***;AccountKey=***REDACTED***;\n'
+        'Authorization: Bearer ***REDACTED***\napi-key: ***REDACTED***'
+    )
+
+
+def test_redact_secrets_returns_text_without_hints_unchanged():
+    """Test _redact_secrets skips the regex passes when no secret hint is present."""
+    text = '[{"name": "apim-1", "gatewayUrl": "https://apim-1.azure-api.net"}]'
+    assert az._redact_secrets(text) is text
+
+
+def test_maybe_add_az_debug_flag_when_debug_enabled(monkeypatch):
     """Test _maybe_add_az_debug_flag adds --debug when logging is DEBUG."""
-    with patch('azure_resources.is_debug_enabled', return_value=True):
-        result = az._maybe_add_az_debug_flag('az group list')
-        assert '--debug' in result
+    monkeypatch.setattr(az, 'is_debug_enabled', lambda: True)
 
+    result = az._maybe_add_az_debug_flag('az group list')
+    assert '--debug' in result
 
-def test_maybe_add_az_debug_flag_when_debug_disabled():
-    """Test _maybe_add_az_debug_flag doesn't add --debug when logging is not DEBUG."""
-    with patch('azure_resources.is_debug_enabled', return_value=False):
-        result = az._maybe_add_az_debug_flag('az group list')
-        assert result == 'az group list'
 
+def test_maybe_add_az_debug_flag_when_debug_disabled(monkeypatch):
+    """Test _maybe_add_az_debug_flag doesn't add --debug when logging is not DEBUG."""
+    monkeypatch.setattr(az, 'is_debug_enabled', lambda: False)
 
-def test_maybe_add_az_debug_flag_with_pipe():
-    """Test _maybe_add_az_debug_flag handles commands with pipes."""
-    with patch('azure_resources.is_debug_enabled', return_value=True):
-        result = az._maybe_add_az_debug_flag('az group list | jq .')
-        assert '--debug' in result
-        assert result.index('--debug') < result.index('|')
+    result = az._maybe_add_az_debug_flag('az group list')
+    assert result == 'az group list'
 
 
-def test_maybe_add_az_debug_flag_with_redirect():
-    """Test _maybe_add_az_debug_flag handles commands with output redirection."""
-    with patch('azure_resources.is_debug_enabled', return_value=True):
-        result = az._maybe_add_az_debug_flag('az group list > output.txt')
-        assert '--debug' in result
-        assert result.index('--debug') < result.index('>')
+@pytest.mark.parametrize(
+    'command, expected',
+    [
+        ('az group list | grep test', 'az group list --debug | grep test'),
+        ('az group list > output.txt', 'az group list --debug > output.txt'),
+        ('az deployment group create -g rg < params.json', 'az deployment group create -g rg --debug < params.json'),
+        ('az group list || echo failed', 'az group list --debug || echo failed'),
+        ('az group list && az account show', 'az group list --debug && az account show'),
+        ('az group show -n rg || echo missing | tee log', 'az group show -n rg --debug || echo missing | tee log'),
+    ],
+)
+def test_maybe_add_az_debug_flag_before_first_operator(command, expected):
+    """Test _maybe_add_az_debug_flag inserts --debug before the earliest pipe, redirect, or chaining operator."""
+    assert az._maybe_add_az_debug_flag(command, debug_enabled=True) == expected
 
 
-def test_maybe_add_az_debug_flag_already_has_debug():
+def test_maybe_add_az_debug_flag_already_has_debug(monkeypatch):
     """Test _maybe_add_az_debug_flag doesn't duplicate --debug flag."""
-    with patch('azure_resources.is_debug_enabled', return_value=True):
-        result = az._maybe_add_az_debug_flag('az group list --debug')
-        assert result.count('--debug') == 1
+    monkeypatch.setattr(az, 'is_debug_enabled', lambda: True)
 
+    result = az._maybe_add_az_debug_flag('az group list --debug')
+    assert result.count('--debug') == 1
 
-def test_maybe_add_az_debug_flag_non_az_command():
+
+def test_maybe_add_az_debug_flag_non_az_command(monkeypatch):
     """Test _maybe_add_az_debug_flag doesn't modify non-az commands."""
-    with patch('azure_resources.is_debug_enabled', return_value=True):
-        result = az._maybe_add_az_debug_flag('echo hello')
-        assert result == 'echo hello'
+    monkeypatch.setattr(az, 'is_debug_enabled', lambda: True)
+
+    result = az._maybe_add_az_debug_flag('echo hello')
+    assert result == 'echo hello'
 
 
 def test_extract_az_cli_error_message_with_json_error():
@@ -1661,80 +1345,60 @@ def test_is_az_command_rejects_non_az_commands():
     assert az._is_az_command('azurecli') is False
 
 
-def test_run_with_exception_in_subprocess():
+def test_run_with_exception_in_subprocess(monkeypatch):
     """Test run() handles subprocess exceptions gracefully."""
-    with patch('azure_resources.subprocess.run') as mock_subprocess:
-        mock_subprocess.side_effect = Exception('Subprocess failed')
+    monkeypatch.setattr(az.subprocess, 'run', Mock(side_effect=Exception('Subprocess failed')))
 
-        result = az.run('az group list')
+    result = az.run('az group list')
 
-        assert result.success is False
-        assert 'Subprocess failed' in result.text
+    assert result.success is False
+    assert 'Subprocess failed' in result.text
 
 
-def test_run_with_stderr_only():
+def test_run_with_stderr_only(monkeypatch):
     """Test run() handles commands that only output to stderr."""
-    with patch('azure_resources.subprocess.run') as mock_subprocess:
-        mock_process = Mock()
-        mock_process.returncode = 0
-        mock_process.stdout = ''
-        mock_process.stderr = 'Some warning message'
-        mock_subprocess.return_value = mock_process
+    completed = SimpleNamespace(returncode=0, stdout='', stderr='Some warning message')
+    monkeypatch.setattr(az.subprocess, 'run', lambda *_, **__: completed)
 
-        result = az.run('az group list')
+    result = az.run('az group list')
 
-        assert result.success is True
+    assert result.success is True
 
 
-def test_run_with_az_debug_flag_already_present():
+def test_run_with_az_debug_flag_already_present(monkeypatch):
     """Test run() doesn't duplicate --debug flag."""
-    with patch('azure_resources.is_debug_enabled', return_value=True):
-        with patch('azure_resources.subprocess.run') as mock_subprocess:
-            mock_process = Mock()
-            mock_process.returncode = 0
-            mock_process.stdout = '[]'
-            mock_process.stderr = ''
-            mock_subprocess.return_value = mock_process
+    mock_subprocess = Mock(return_value=SimpleNamespace(returncode=0, stdout='[]', stderr=''))
+    monkeypatch.setattr(az, 'is_debug_enabled', lambda: True)
+    monkeypatch.setattr(az.subprocess, 'run', mock_subprocess)
 
-            az.run('az group list --debug')
+    az.run('az group list --debug')
 
-            # Check that --debug appears only once in the command
-            called_command = mock_subprocess.call_args[0][0]
-            assert called_command.count('--debug') == 1
+    # Check that --debug appears only once in the command
+    called_command = mock_subprocess.call_args.args[0]
+    assert called_command.count('--debug') == 1
 
 
-def test_run_with_json_output_success():
+def test_run_with_json_output_success(monkeypatch):
     """Test run() with successful JSON output."""
-    with patch('azure_resources.subprocess.run') as mock_subprocess:
-        mock_process = Mock()
-        mock_process.returncode = 0
-        mock_process.stdout = '{"result": "success"}'
-        mock_process.stderr = ''
-        mock_subprocess.return_value = mock_process
+    completed = SimpleNamespace(returncode=0, stdout='{"result": "success"}', stderr='')
+    monkeypatch.setattr(az.subprocess, 'run', lambda *_, **__: completed)
 
-        result = az.run('az group show --name test-rg')
+    result = az.run('az group show --name test-rg')
 
-        assert result.success is True
-        assert '{"result": "success"}' in result.text
+    assert result.success is True
+    assert '{"result": "success"}' in result.text
 
 
-def test_run_with_complex_shell_expression():
+def test_run_with_complex_shell_expression(monkeypatch):
     """Test run() handles complex shell expressions with operators."""
-    with patch('azure_resources.is_debug_enabled', return_value=True):
-        with patch('azure_resources.subprocess.run') as mock_subprocess:
-            mock_process = Mock()
-            mock_process.returncode = 0
-            mock_process.stdout = 'output'
-            mock_process.stderr = ''
-            mock_subprocess.return_value = mock_process
+    mock_subprocess = Mock(return_value=SimpleNamespace(returncode=0, stdout='output', stderr=''))
+    monkeypatch.setattr(az, 'is_debug_enabled', lambda: True)
+    monkeypatch.setattr(az.subprocess, 'run', mock_subprocess)
 
-            az.run('az group list || echo "failed"')
+    az.run('az group list || echo "failed"')
 
-            # --debug should be inserted before the ||
-            called_command = mock_subprocess.call_args[0][0]
-            debug_pos = called_command.find('--debug')
-            pipe_pos = called_command.find('||')
-            assert debug_pos < pipe_pos
+    # --debug should be inserted before the ||
+    assert mock_subprocess.call_args.args[0] == 'az group list --debug || echo "failed"'
 
 
 # ========================================
@@ -1764,6 +1428,11 @@ class TestStripAnsi:
         result = az._strip_ansi('')
         assert not result
 
+    def test_strip_ansi_without_escape_skips_regex(self, monkeypatch):
+        monkeypatch.setattr(az, '_ANSI_ESCAPE_RE', None)
+        text = 'ERROR: Resource group not found'
+        assert az._strip_ansi(text) is text
+
 
 class TestRedactSecrets:
     """Test secret redaction in output."""
@@ -1853,36 +1522,6 @@ class TestMaybeAddAzDebugFlag:
         result = az._maybe_add_az_debug_flag(command)
         assert result.count('--debug') == 1
 
-    def test_add_debug_flag_before_pipe(self, monkeypatch):
-        monkeypatch.setattr('azure_resources.is_debug_enabled', lambda: True)
-
-        command = 'az group list | grep test'
-        result = az._maybe_add_az_debug_flag(command)
-        assert '--debug' in result
-        assert result.index('--debug') < result.index('|')
-
-    def test_add_debug_flag_before_redirect(self, monkeypatch):
-        monkeypatch.setattr('azure_resources.is_debug_enabled', lambda: True)
-
-        command = 'az group list > output.txt'
-        result = az._maybe_add_az_debug_flag(command)
-        assert '--debug' in result
-        assert result.index('--debug') < result.index('>')
-
-    def test_add_debug_flag_before_or_operator(self, monkeypatch):
-        monkeypatch.setattr('azure_resources.is_debug_enabled', lambda: True)
-
-        command = 'az group list || echo failed'
-        result = az._maybe_add_az_debug_flag(command)
-        assert '--debug' in result
-
-    def test_add_debug_flag_before_and_operator(self, monkeypatch):
-        monkeypatch.setattr('azure_resources.is_debug_enabled', lambda: True)
-
-        command = 'az group list && az account show'
-        result = az._maybe_add_az_debug_flag(command)
-        assert '--debug' in result
-
 
 class TestExtractAzCliErrorMessage:
     """Test Azure CLI error message extraction."""
@@ -1965,6 +1604,10 @@ class TestFormatDuration:
         result = az._format_duration(start_time)
         assert '[1m:' in result
 
+    def test_format_duration_truncates_to_whole_seconds(self, monkeypatch):
+        monkeypatch.setattr(az.time, 'time', lambda: 1000.0)
+        assert az._format_duration(1000.0 - 125.9) == '[2m:5s]'
+
 
 class TestLooksLikeJson:
     """Test JSON detection."""
@@ -1978,7 +1621,8 @@ class TestLooksLikeJson:
         assert az._looks_like_json('  [1, 2, 3]') is True
 
     def test_looks_like_json_with_invalid(self):
-        assert az._looks_like_json('{"key": value}') is False
+        # Only the leading character is inspected; malformed JSON still looks like JSON.
+        assert az._looks_like_json('{"key": value}') is True
         assert az._looks_like_json('not json') is False
 
     def test_looks_like_json_empty(self):
@@ -1998,12 +1642,8 @@ class TestRunFunctionEdgeCases:
     """Test edge cases in the run() function."""
 
     def test_run_with_stderr_only(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_command', 'print_error', 'print_ok'])
 
-        mock_completed = Mock()
-        mock_completed.returncode = 0
-        mock_completed.stdout = ''
-        mock_completed.stderr = 'Some warning'
+        mock_completed = SimpleNamespace(returncode=0, stdout='', stderr='Some warning')
 
         monkeypatch.setattr('azure_resources.subprocess.run', lambda *a, **k: mock_completed)
 
@@ -2011,12 +1651,8 @@ class TestRunFunctionEdgeCases:
         assert result.success is True
 
     def test_run_with_empty_output(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_command', 'print_ok'])
 
-        mock_completed = Mock()
-        mock_completed.returncode = 0
-        mock_completed.stdout = ''
-        mock_completed.stderr = ''
+        mock_completed = SimpleNamespace(returncode=0, stdout='', stderr='')
 
         monkeypatch.setattr('azure_resources.subprocess.run', lambda *a, **k: mock_completed)
 
@@ -2025,12 +1661,8 @@ class TestRunFunctionEdgeCases:
         assert not result.text
 
     def test_run_with_none_stdout_stderr(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_command', 'print_ok'])
 
-        mock_completed = Mock()
-        mock_completed.returncode = 0
-        mock_completed.stdout = None
-        mock_completed.stderr = None
+        mock_completed = SimpleNamespace(returncode=0, stdout=None, stderr=None)
 
         monkeypatch.setattr('azure_resources.subprocess.run', lambda *a, **k: mock_completed)
 
@@ -2038,12 +1670,8 @@ class TestRunFunctionEdgeCases:
         assert result.success is True
 
     def test_run_with_non_az_command(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_command', 'print_ok'])
 
-        mock_completed = Mock()
-        mock_completed.returncode = 0
-        mock_completed.stdout = 'output'
-        mock_completed.stderr = ''
+        mock_completed = SimpleNamespace(returncode=0, stdout='output', stderr='')
 
         run_calls = []
 
@@ -2058,12 +1686,8 @@ class TestRunFunctionEdgeCases:
         assert len(run_calls) == 1
 
     def test_run_with_json_stdout(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_command', 'print_ok'])
 
-        mock_completed = Mock()
-        mock_completed.returncode = 0
-        mock_completed.stdout = '{"key": "value"}'
-        mock_completed.stderr = ''
+        mock_completed = SimpleNamespace(returncode=0, stdout='{"key": "value"}', stderr='')
 
         monkeypatch.setattr('azure_resources.subprocess.run', lambda *a, **k: mock_completed)
 
@@ -2072,12 +1696,8 @@ class TestRunFunctionEdgeCases:
         assert result.json_data == {'key': 'value'}
 
     def test_run_command_with_special_characters(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_command', 'print_ok'])
 
-        mock_completed = Mock()
-        mock_completed.returncode = 0
-        mock_completed.stdout = 'output'
-        mock_completed.stderr = ''
+        mock_completed = SimpleNamespace(returncode=0, stdout='output', stderr='')
 
         monkeypatch.setattr('azure_resources.subprocess.run', lambda *a, **k: mock_completed)
 
@@ -2089,13 +1709,10 @@ class TestGetAccountInfoEdgeCases:
     """Test edge cases in get_account_info()."""
 
     def test_get_account_info_partial_failure(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_val', 'print_error'])
 
         account_output = _create_account_output()
 
-        ad_output = Mock()
-        ad_output.success = False
-        ad_output.json_data = None
+        ad_output = create_mock_output(False)
 
         call_count = [0]
 
@@ -2111,13 +1728,10 @@ class TestGetAccountInfoEdgeCases:
             az.get_account_info()
 
     def test_get_account_info_success(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_val', 'print_error'])
 
         account_output = _create_account_output()
 
-        ad_output = Mock()
-        ad_output.success = True
-        ad_output.json_data = {'id': 'user-123'}
+        ad_output = create_mock_output(json_data={'id': 'user-123'})
 
         call_count = [0]
 
@@ -2140,7 +1754,6 @@ class TestGetDeploymentName:
     """Test get_deployment_name function."""
 
     def test_get_deployment_name_custom_directory(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_val'])
 
         result = az.get_deployment_name('my-sample')
         assert 'deploy-my-sample-' in result
@@ -2150,11 +1763,8 @@ class TestGetFrontdoorUrl:
     """Test get_frontdoor_url function."""
 
     def test_get_frontdoor_url_not_found(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_val'])
 
-        mock_output = Mock()
-        mock_output.success = False
-        mock_output.json_data = None
+        mock_output = create_mock_output(False)
 
         monkeypatch.setattr('azure_resources.run', lambda *a, **k: mock_output)
 
@@ -2166,12 +1776,8 @@ class TestGetApimUrl:
     """Test get_apim_url function."""
 
     def test_get_apim_url_no_results(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_val'])
 
-        mock_output = Mock()
-        mock_output.success = True
-        mock_output.json_data = []
-        mock_output.is_json = True
+        mock_output = create_mock_output()
 
         monkeypatch.setattr('azure_resources.run', lambda *a, **k: mock_output)
 
@@ -2182,41 +1788,30 @@ class TestGetApimUrl:
 class TestListApimSubscriptions:
     """Test list_apim_subscriptions function."""
 
-    def test_list_apim_subscriptions_success(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_val'])
+    def test_list_apim_subscriptions_success(self, run_dispatcher):
 
-        mock_output = Mock()
-        mock_output.success = True
-        mock_output.json_data = {'value': [{'id': 'sub-1', 'displayName': 'Subscription 1'}, {'id': 'sub-2', 'displayName': 'Subscription 2'}]}
-        mock_output.is_json = True
+        mock_output = create_mock_output(
+            json_data={'value': [{'id': 'sub-1', 'displayName': 'Subscription 1'}, {'id': 'sub-2', 'displayName': 'Subscription 2'}]}
+        )
 
-        monkeypatch.setattr('azure_resources.run', lambda *a, **k: mock_output)
+        run_dispatcher.on('az account show', Output(True, 'sub-123\n')).on('/subscriptions?', mock_output)
 
         result = az.list_apim_subscriptions('test-apim', 'test-rg')
         assert len(result) == 2
         assert result[0]['id'] == 'sub-1'
 
-    def test_list_apim_subscriptions_empty(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_val'])
+    def test_list_apim_subscriptions_empty(self, run_dispatcher):
 
-        mock_output = Mock()
-        mock_output.success = True
-        mock_output.json_data = {'value': []}
-        mock_output.is_json = True
+        mock_output = create_mock_output(json_data={'value': []})
 
-        monkeypatch.setattr('azure_resources.run', lambda *a, **k: mock_output)
+        run_dispatcher.on('az account show', Output(True, 'sub-123\n')).on('/subscriptions?', mock_output)
 
         result = az.list_apim_subscriptions('test-apim', 'test-rg')
         assert result == []
 
-    def test_list_apim_subscriptions_failure(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_val'])
+    def test_list_apim_subscriptions_failure(self, run_dispatcher):
 
-        mock_output = Mock()
-        mock_output.success = False
-        mock_output.json_data = None
-
-        monkeypatch.setattr('azure_resources.run', lambda *a, **k: mock_output)
+        run_dispatcher.on('az account show', Output(True, 'sub-123\n')).on('/subscriptions?', create_mock_output(False))
 
         result = az.list_apim_subscriptions('test-apim', 'test-rg')
         assert result == []
@@ -2233,9 +1828,7 @@ class TestListApimSubscriptions:
     def test_list_subscriptions_account_show_fails(self, monkeypatch):
         """Test list_apim_subscriptions when account show fails."""
 
-        mock_output = Mock()
-        mock_output.success = False
-        mock_output.text = ''
+        mock_output = create_mock_output(False)
 
         monkeypatch.setattr('azure_resources.run', lambda *a, **k: mock_output)
 
@@ -2251,14 +1844,10 @@ class TestListApimSubscriptions:
         def mock_run(cmd, *args, **kwargs):
             call_count[0] += 1
             if call_count[0] == 1:  # First call is account show
-                output = Mock()
-                output.success = True
-                output.text = 'sub-123'
+                output = create_mock_output(text='sub-123')
                 return output
             else:  # Second call is REST API
-                output = Mock()
-                output.success = True
-                output.json_data = {'value': 'not-a-list'}
+                output = create_mock_output(json_data={'value': 'not-a-list'})
                 return output
 
         monkeypatch.setattr('azure_resources.run', mock_run)
@@ -2271,16 +1860,14 @@ class TestListApimSubscriptions:
 class TestGetAppGwEndpoint:
     """Test get_appgw_endpoint function."""
 
-    def test_get_appgw_endpoint_not_found(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_ok', 'print_warning'])
+    def test_get_appgw_endpoint_not_found(self, mock_run):
 
-        with patch('azure_resources.run') as mock_run:
-            mock_run.return_value = Output(False, 'No gateways found')
+        mock_run.return_value = Output(False, 'No gateways found')
 
-            hostname, ip = az.get_appgw_endpoint('test-rg')
+        hostname, ip = az.get_appgw_endpoint('test-rg')
 
-            assert hostname is None
-            assert ip is None
+        assert hostname is None
+        assert ip is None
 
 
 class TestGetUniqueInfraSuffix:
@@ -2289,9 +1876,7 @@ class TestGetUniqueInfraSuffix:
     def test_get_unique_suffix_empty_rg(self, monkeypatch):
         # Mock the run function to avoid actual Azure CLI deployment
         def mock_run(cmd, *args, **kwargs):
-            output = Mock()
-            output.success = True
-            output.text = 'abcd1234efgh5'
+            output = create_mock_output(text='abcd1234efgh5')
             return output
 
         monkeypatch.setattr('azure_resources.run', mock_run)
@@ -2303,12 +1888,9 @@ class TestFindInfrastructureInstances:
     """Test find_infrastructure_instances function."""
 
     def test_find_infrastructure_instances_no_matches(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_val', 'print_message'])
 
         def mock_run(cmd, *args, **kwargs):
-            output = Mock()
-            output.success = True
-            output.text = ''
+            output = create_mock_output()
             return output
 
         monkeypatch.setattr('azure_resources.run', mock_run)
@@ -2319,11 +1901,7 @@ class TestFindInfrastructureInstances:
     def test_find_with_invalid_index_format(self, monkeypatch):
         """Test finding resource groups skips invalid index formats."""
 
-        mock_output = Mock()
-        mock_output.success = True
-        mock_output.text = """apim-infra-simple-apim
-apim-infra-simple-apim-abc
-apim-infra-simple-apim-2"""
+        mock_output = Output(True, 'apim-infra-simple-apim\napim-infra-simple-apim-abc\napim-infra-simple-apim-2')
 
         monkeypatch.setattr('azure_resources.run', lambda *a, **k: mock_output)
 
@@ -2339,14 +1917,12 @@ class TestGetInfraRgName:
     """Test get_infra_rg_name function."""
 
     def test_get_infra_rg_name_with_index(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_val'])
 
         result = az.get_infra_rg_name(INFRASTRUCTURE.SIMPLE_APIM, 1)
         assert 'simple-apim' in result
         assert '1' in result
 
     def test_get_infra_rg_name_without_index(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_val'])
 
         result = az.get_infra_rg_name(INFRASTRUCTURE.APIM_ACA)
         assert 'apim-aca' in result
@@ -2356,14 +1932,12 @@ class TestGetRgName:
     """Test get_rg_name function."""
 
     def test_get_rg_name_with_index(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_val'])
 
         result = az.get_rg_name('my-sample', 2)
         assert 'my-sample' in result
         assert '2' in result
 
     def test_get_rg_name_without_index(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_val'])
 
         result = az.get_rg_name('test-deployment')
         assert 'test-deployment' in result
@@ -2374,11 +1948,8 @@ class TestCheckApimBlobPermissions:
     """Test check_apim_blob_permissions function."""
 
     def test_check_apim_blob_permissions_no_principal_id(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_val', 'print_info', 'print_error', 'print_warning'])
 
-        mock_output = Mock()
-        mock_output.success = False
-        mock_output.json_data = None
+        mock_output = create_mock_output(False)
 
         monkeypatch.setattr('azure_resources.run', lambda *a, **k: mock_output)
 
@@ -2390,47 +1961,39 @@ class TestCleanupOldJwtSigningKeys:
     """Test cleanup_old_jwt_signing_keys function."""
 
     def test_cleanup_old_jwt_no_other_keys(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_val', 'print_info', 'print_message'])
 
-        mock_output = Mock()
-        mock_output.success = True
-        mock_output.json_data = [{'name': 'JwtSigningKey-authX-123'}]
-        mock_output.is_json = True
+        mock_output = create_mock_output(text='JwtSigningKey-authX-123\n')
 
         monkeypatch.setattr('azure_resources.run', lambda *a, **k: mock_output)
 
         result = az.cleanup_old_jwt_signing_keys('apim', 'rg', 'JwtSigningKey-authX-123')
-        assert isinstance(result, bool)
+        assert result is True
 
-    def test_cleanup_old_jwt_list_fails(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_val', 'print_info', 'print_message', 'print_error'])
+    def test_cleanup_old_jwt_run_raises(self, monkeypatch):
+        """Test cleanup returns False when listing the keys raises."""
 
-        mock_output = Mock()
-        mock_output.success = False
-        mock_output.json_data = None
+        def failing_run(*args, **kwargs):
+            raise RuntimeError('az unavailable')
 
-        monkeypatch.setattr('azure_resources.run', lambda *a, **k: mock_output)
+        monkeypatch.setattr(az, 'run', failing_run)
 
         result = az.cleanup_old_jwt_signing_keys('apim', 'rg', 'JwtSigningKey-authX-123')
         assert result is False
 
+    def test_cleanup_old_jwt_list_fails(self, monkeypatch):
 
-class TestGetApimSubscriptionKey:
-    """Test get_apim_subscription_key function."""
+        mock_output = create_mock_output(False)
 
-    def test_get_apim_subscription_key_invalid_params(self):
-        result = az.get_apim_subscription_key('', 'rg')
-        assert result is None
+        monkeypatch.setattr('azure_resources.run', lambda *a, **k: mock_output)
 
-        result = az.get_apim_subscription_key('apim', '')
-        assert result is None
+        result = az.cleanup_old_jwt_signing_keys('apim', 'rg', 'JwtSigningKey-authX-123')
+        assert result is False
 
 
 class TestGetEndpoints:
     """Test get_endpoints function."""
 
     def test_get_endpoints_with_simple_apim(self, monkeypatch):
-        suppress_module_functions(monkeypatch, az, ['print_message', 'print_val'])
 
         monkeypatch.setattr('azure_resources.get_frontdoor_url', lambda *a, **k: None)
         monkeypatch.setattr('azure_resources.get_apim_url', lambda *a, **k: 'https://apim.azure-api.net')
@@ -2448,14 +2011,9 @@ class TestRunFunction:
     def test_run_with_non_json_stdout_in_debug(self, monkeypatch):
         """Test that non-JSON stdout is printed in debug mode."""
 
-        suppress_module_functions(monkeypatch, az, ['print_ok', 'print_error', 'print_plain'])
-
         monkeypatch.setattr('azure_resources.is_debug_enabled', lambda: True)
 
-        mock_result = Mock()
-        mock_result.returncode = 0
-        mock_result.stdout = 'Plain text output that is not JSON'
-        mock_result.stderr = ''
+        mock_result = SimpleNamespace(returncode=0, stdout='Plain text output that is not JSON', stderr='')
 
         monkeypatch.setattr('azure_resources.subprocess.run', lambda *a, **k: mock_result)
 
@@ -2467,14 +2025,9 @@ class TestRunFunction:
     def test_run_with_stderr_and_debug_disabled(self, monkeypatch):
         """Test that stderr is printed when debug is disabled."""
 
-        suppress_module_functions(monkeypatch, az, ['print_ok', 'print_error', 'print_plain'])
-
         monkeypatch.setattr('azure_resources.is_debug_enabled', lambda: False)
 
-        mock_result = Mock()
-        mock_result.returncode = 1
-        mock_result.stdout = ''
-        mock_result.stderr = 'Error message in stderr'
+        mock_result = SimpleNamespace(returncode=1, stdout='', stderr='Error message in stderr')
 
         monkeypatch.setattr('azure_resources.subprocess.run', lambda *a, **k: mock_result)
 
@@ -2485,15 +2038,10 @@ class TestRunFunction:
     def test_run_failure_with_no_normalized_error_and_debug_enabled(self, monkeypatch):
         """Test run failure when error extraction returns empty and debug is enabled."""
 
-        suppress_module_functions(monkeypatch, az, ['print_ok', 'print_error', 'print_plain'])
-
         monkeypatch.setattr('azure_resources.is_debug_enabled', lambda: True)
         monkeypatch.setattr('azure_resources._extract_az_cli_error_message', lambda *a: '')
 
-        mock_result = Mock()
-        mock_result.returncode = 1
-        mock_result.stdout = 'Some error output'
-        mock_result.stderr = ''
+        mock_result = SimpleNamespace(returncode=1, stdout='Some error output', stderr='')
 
         monkeypatch.setattr('azure_resources.subprocess.run', lambda *a, **k: mock_result)
 
@@ -2505,14 +2053,9 @@ class TestRunFunction:
     def test_run_with_stderr_in_debug_mode(self, monkeypatch):
         """Test that stderr is logged in debug mode."""
 
-        suppress_module_functions(monkeypatch, az, ['print_ok', 'print_error', 'print_plain'])
-
         monkeypatch.setattr('azure_resources.is_debug_enabled', lambda: True)
 
-        mock_result = Mock()
-        mock_result.returncode = 0
-        mock_result.stdout = '{"result": "success"}'
-        mock_result.stderr = 'Some warning in stderr'
+        mock_result = SimpleNamespace(returncode=0, stdout='{"result": "success"}', stderr='Some warning in stderr')
 
         monkeypatch.setattr('azure_resources.subprocess.run', lambda *a, **k: mock_result)
 
@@ -2523,14 +2066,9 @@ class TestRunFunction:
     def test_run_success_with_non_json_stdout_not_in_debug(self, monkeypatch):
         """Test that non-JSON stdout is logged even when debug is disabled."""
 
-        suppress_module_functions(monkeypatch, az, ['print_ok', 'print_error', 'print_plain'])
-
         monkeypatch.setattr('azure_resources.is_debug_enabled', lambda: False)
 
-        mock_result = Mock()
-        mock_result.returncode = 0
-        mock_result.stdout = 'Plain text success output'
-        mock_result.stderr = ''
+        mock_result = SimpleNamespace(returncode=0, stdout='Plain text success output', stderr='')
 
         monkeypatch.setattr('azure_resources.subprocess.run', lambda *a, **k: mock_result)
 
@@ -2545,11 +2083,7 @@ class TestCleanupJwtSigningKeysEdgeCases:
     def test_cleanup_with_empty_key_list(self, monkeypatch):
         """Test cleanup when API returns empty string."""
 
-        suppress_module_functions(monkeypatch, az, ['print_info', 'print_error'])
-
-        mock_output = Mock()
-        mock_output.success = True
-        mock_output.text = ''
+        mock_output = create_mock_output()
 
         monkeypatch.setattr('azure_resources.run', lambda *a, **k: mock_output)
 
@@ -2564,8 +2098,6 @@ class TestCreateResourceGroupWithTags:
     def test_create_resource_group_with_tags(self, monkeypatch):
         """Test creating resource group with additional tags."""
 
-        suppress_module_functions(monkeypatch, az, ['print_val', 'print_ok'])
-
         calls = []
 
         def mock_run(cmd, *args, **kwargs):
@@ -2593,21 +2125,17 @@ class TestGetApimSubscriptionKeyEdgeCases:
         def mock_run(cmd, *args, **kwargs):
             call_count[0] += 1
             if call_count[0] == 1:  # account show
-                output = Mock()
-                output.success = True
-                output.text = 'sub-123'
+                output = create_mock_output(text='sub-123')
                 return output
             elif 'subscriptions?' in cmd:  # list subscriptions
-                output = Mock()
-                output.success = True
-                output.json_data = {
-                    'value': [{'name': 'sid-1', 'properties': {'state': 'suspended'}}, {'name': 'sid-2', 'properties': {'state': 'cancelled'}}]
-                }
+                output = create_mock_output(
+                    json_data={
+                        'value': [{'name': 'sid-1', 'properties': {'state': 'suspended'}}, {'name': 'sid-2', 'properties': {'state': 'cancelled'}}]
+                    }
+                )
                 return output
             else:  # listSecrets
-                output = Mock()
-                output.success = True
-                output.json_data = {'primaryKey': 'key-123'}
+                output = create_mock_output(json_data={'primaryKey': 'key-123'})
                 return output
 
         monkeypatch.setattr('azure_resources.run', mock_run)
@@ -2625,19 +2153,13 @@ class TestGetApimSubscriptionKeyEdgeCases:
         def mock_run(cmd, *args, **kwargs):
             call_count[0] += 1
             if call_count[0] == 1:  # account show
-                output = Mock()
-                output.success = True
-                output.text = 'sub-123'
+                output = create_mock_output(text='sub-123')
                 return output
             elif 'subscriptions?' in cmd:  # list subscriptions
-                output = Mock()
-                output.success = True
-                output.json_data = {'value': [{'name': 'sid-1', 'properties': {'state': 'active'}}]}
+                output = create_mock_output(json_data={'value': [{'name': 'sid-1', 'properties': {'state': 'active'}}]})
                 return output
             else:  # listSecrets fails
-                output = Mock()
-                output.success = False
-                output.json_data = None
+                output = create_mock_output(False)
                 return output
 
         monkeypatch.setattr('azure_resources.run', mock_run)
@@ -2654,19 +2176,13 @@ class TestGetApimSubscriptionKeyEdgeCases:
         def mock_run(cmd, *args, **kwargs):
             call_count[0] += 1
             if call_count[0] == 1:  # account show
-                output = Mock()
-                output.success = True
-                output.text = 'sub-123'
+                output = create_mock_output(text='sub-123')
                 return output
             elif 'subscriptions?' in cmd:  # list subscriptions
-                output = Mock()
-                output.success = True
-                output.json_data = {'value': [{'name': 'sid-1', 'properties': {'state': 'active'}}]}
+                output = create_mock_output(json_data={'value': [{'name': 'sid-1', 'properties': {'state': 'active'}}]})
                 return output
             else:  # listSecrets returns empty key
-                output = Mock()
-                output.success = True
-                output.json_data = {'primaryKey': '   '}
+                output = create_mock_output(json_data={'primaryKey': '   '})
                 return output
 
         monkeypatch.setattr('azure_resources.run', mock_run)
@@ -2678,9 +2194,7 @@ class TestGetApimSubscriptionKeyEdgeCases:
     def test_get_key_account_show_fails(self, monkeypatch):
         """Test get_apim_subscription_key when account show fails."""
 
-        mock_output = Mock()
-        mock_output.success = False
-        mock_output.text = ''
+        mock_output = create_mock_output(False)
 
         monkeypatch.setattr('azure_resources.run', lambda *a, **k: mock_output)
 
@@ -2696,16 +2210,12 @@ class TestGetApimSubscriptionKeyEdgeCases:
         def mock_run(cmd, *args, **kwargs):
             call_count[0] += 1
             if 'account show' in cmd:
-                output = Mock()
-                output.success = True
-                output.text = 'sub-123'
+                output = create_mock_output(text='sub-123')
                 return output
             elif 'subscriptions?' in cmd:
-                output = Mock()
-                output.success = True
-                output.json_data = {'value': []}
+                output = create_mock_output(json_data={'value': []})
                 return output
-            return Mock(success=False, text='')
+            return create_mock_output(success=False)
 
         monkeypatch.setattr('azure_resources.run', mock_run)
 
@@ -2720,8 +2230,6 @@ class TestGetRgNameWithIndex:
     def test_get_rg_name_formats_with_index(self, monkeypatch):
         """Test get_rg_name properly formats name with index."""
 
-        suppress_module_functions(monkeypatch, az, ['print_val'])
-
         result = az.get_rg_name('my-sample', 5)
 
         assert 'apim-sample-my-sample-5' == result
@@ -2729,8 +2237,6 @@ class TestGetRgNameWithIndex:
     def test_get_rg_name_with_none_index(self, monkeypatch):
         """Test get_rg_name with explicit None index."""
 
-        suppress_module_functions(monkeypatch, az, ['print_val'])
-
         result = az.get_rg_name('my-sample', None)
 
         assert 'apim-sample-my-sample' == result
@@ -2745,10 +2251,7 @@ class TestRunMethodBranches:
         """Test run() when subprocess returncode is 0 (success = True)."""
 
         def mock_run(*args, **kwargs):
-            completed = Mock()
-            completed.stdout = 'output text'
-            completed.stderr = None
-            completed.returncode = 0
+            completed = SimpleNamespace(returncode=0, stdout='output text', stderr=None)
             return completed
 
         monkeypatch.setattr('subprocess.run', mock_run)
@@ -2762,10 +2265,7 @@ class TestRunMethodBranches:
         """Test run() when subprocess returncode is non-zero (success = False)."""
 
         def mock_run(*args, **kwargs):
-            completed = Mock()
-            completed.stdout = 'some output'
-            completed.stderr = 'error output'
-            completed.returncode = 1
+            completed = SimpleNamespace(returncode=1, stdout='some output', stderr='error output')
             return completed
 
         monkeypatch.setattr('subprocess.run', mock_run)
@@ -2781,16 +2281,16 @@ def test_cleanup_old_jwt_signing_keys_with_multiple_old_keys(monkeypatch):
 
     def mock_run(cmd, *args, **kwargs):
         if 'list' in cmd:
-            output = Mock()
-            output.success = True
-            output.text = 'JwtSigningKey-test-sample-1\nJwtSigningKey-test-sample-2\nJwtSigningKey-test-sample-3\nJwtSigningKey-other-1'
+            output = create_mock_output(
+                text='JwtSigningKey-test-sample-1\nJwtSigningKey-test-sample-2\nJwtSigningKey-test-sample-3\nJwtSigningKey-other-1'
+            )
             return output
         elif 'delete' in cmd and 'test-sample-1' in cmd:
-            return Mock(success=True)
+            return create_mock_output()
         elif 'delete' in cmd and 'test-sample-2' in cmd:
-            return Mock(success=True)
+            return create_mock_output()
         else:
-            return Mock(success=True)
+            return create_mock_output()
 
     monkeypatch.setattr('azure_resources.run', mock_run)
 
@@ -2805,14 +2305,12 @@ def test_cleanup_old_jwt_signing_keys_current_is_first(monkeypatch):
 
     def mock_run(cmd, *args, **kwargs):
         if 'list' in cmd:
-            output = Mock()
-            output.success = True
-            output.text = 'JwtSigningKey-test-sample-1\nJwtSigningKey-test-sample-2'
+            output = create_mock_output(text='JwtSigningKey-test-sample-1\nJwtSigningKey-test-sample-2')
             return output
         elif 'delete' in cmd:
-            return Mock(success=True)
+            return create_mock_output()
         else:
-            return Mock(success=True)
+            return create_mock_output()
 
     monkeypatch.setattr('azure_resources.run', mock_run)
 
@@ -2827,14 +2325,14 @@ def test_get_frontdoor_url_endpoint_no_hostname(monkeypatch):
 
     def mock_run(cmd, *args, **kwargs):
         if 'profile list' in cmd:
-            return Mock(success=True, json_data=[{'name': 'profile-123'}])
+            return create_mock_output(text='profile-123\n')
         elif 'endpoint list' in cmd:
-            return Mock(success=True, json_data=[{'hostName': None}])
-        return Mock(success=False)
+            return create_mock_output()
+        return create_mock_output(success=False)
 
     monkeypatch.setattr('azure_resources.run', mock_run)
 
-    result = az.get_frontdoor_url('rg', INFRASTRUCTURE.AFD_APIM_PE)
+    result = az.get_frontdoor_url(INFRASTRUCTURE.AFD_APIM_PE, 'rg')
 
     assert result is None
 
@@ -2845,12 +2343,12 @@ def test_get_frontdoor_url_empty_profile_name(monkeypatch):
 
     def mock_run(cmd, *args, **kwargs):
         if 'profile list' in cmd:
-            return Mock(success=True, json_data=[{'name': ''}])
-        return Mock(success=False)
+            return create_mock_output()
+        return create_mock_output(success=False)
 
     monkeypatch.setattr('azure_resources.run', mock_run)
 
-    result = az.get_frontdoor_url('rg', INFRASTRUCTURE.AFD_APIM_PE)
+    result = az.get_frontdoor_url(INFRASTRUCTURE.AFD_APIM_PE, 'rg')
 
     assert result is None
 
@@ -2860,9 +2358,7 @@ def test_list_apim_subscriptions_invalid_json_data(monkeypatch):
     """Test list_apim_subscriptions when json_data is not a dict."""
 
     def mock_run(cmd, *args, **kwargs):
-        output = Mock()
-        output.success = True
-        output.json_data = None
+        output = create_mock_output()
         return output
 
     monkeypatch.setattr('azure_resources.run', mock_run)
@@ -2877,9 +2373,7 @@ def test_list_apim_subscriptions_missing_value_key(monkeypatch):
     """Test list_apim_subscriptions when value key is missing in response."""
 
     def mock_run(cmd, *args, **kwargs):
-        output = Mock()
-        output.success = True
-        output.json_data = {'items': []}
+        output = create_mock_output(json_data={'items': []})
         return output
 
     monkeypatch.setattr('azure_resources.run', mock_run)
@@ -2894,9 +2388,7 @@ def test_get_appgw_endpoint_empty_hostname(monkeypatch):
     """Test get_appgw_endpoint when hostname is empty in listener."""
 
     def mock_run(cmd, *args, **kwargs):
-        output = Mock()
-        output.success = True
-        output.json_data = [{'name': 'appgw-123', 'httpListeners': [{'hostName': ''}], 'frontendIPConfigurations': []}]
+        output = create_mock_output(json_data={'name': 'appgw-123', 'hostNames': [''], 'publicIpIds': []})
         return output
 
     monkeypatch.setattr('azure_resources.run', mock_run)
@@ -2910,154 +2402,132 @@ def test_get_appgw_endpoint_empty_hostname(monkeypatch):
 def test_run_with_az_lock_acquired(monkeypatch):
     """Test run function when az command lock is acquired (not None path)."""
 
-    suppress_module_functions(monkeypatch, az, ['print_command'])
-
-    with patch('azure_resources.is_debug_enabled', return_value=False):
-        with patch('azure_resources._is_az_command', return_value=True):
-            with patch('azure_resources._AZ_CLI_LOCK') as mock_lock:
-                mock_lock.__enter__ = Mock(return_value=None)
-                mock_lock.__exit__ = Mock(return_value=None)
+    mock_lock = Mock()
+    mock_lock.__enter__ = Mock(return_value=None)
+    mock_lock.__exit__ = Mock(return_value=None)
+    monkeypatch.setattr(az, 'is_debug_enabled', lambda: False)
+    monkeypatch.setattr(az, '_is_az_command', lambda _command: True)
+    monkeypatch.setattr(az, '_AZ_CLI_LOCK', mock_lock)
+    monkeypatch.setattr(az.subprocess, 'run', lambda *_, **__: SimpleNamespace(returncode=0, stdout='success output', stderr=''))
 
-                with patch('subprocess.run') as mock_subprocess:
-                    mock_subprocess.return_value = Mock(returncode=0, stdout='success output', stderr='')
+    result = az.run('az group list')
 
-                    result = az.run('az group list')
-
-                    assert result.success
-                    assert result.text == 'success output'
-                    mock_lock.__enter__.assert_called_once()
-                    mock_lock.__exit__.assert_called_once()
+    assert result.success
+    assert result.text == 'success output'
+    mock_lock.__enter__.assert_called_once()
+    mock_lock.__exit__.assert_called_once()
 
 
 def test_run_with_explicit_log_command_false(monkeypatch):
     """Test run function with explicit log_command=False to hit line 203."""
 
-    suppress_module_functions(monkeypatch, az, ['print_command'])
-
-    with patch('azure_resources.is_debug_enabled', return_value=False):
-        with patch('subprocess.run') as mock_subprocess:
-            mock_subprocess.return_value = Mock(returncode=0, stdout='test output', stderr='')
+    monkeypatch.setattr(az, 'is_debug_enabled', lambda: False)
+    monkeypatch.setattr(az.subprocess, 'run', lambda *_, **__: SimpleNamespace(returncode=0, stdout='test output', stderr=''))
 
-            result = az.run('echo test', log_command=False)
+    result = az.run('echo test', log_command=False)
 
-            assert result.success
-            assert result.text == 'test output'
+    assert result.success
+    assert result.text == 'test output'
 
 
 def test_run_with_explicit_log_command_true(monkeypatch):
     """Test run function with explicit log_command=True to hit line 203."""
 
-    suppress_module_functions(monkeypatch, az, ['print_command'])
+    monkeypatch.setattr(az, 'is_debug_enabled', lambda: False)
+    monkeypatch.setattr(az.subprocess, 'run', lambda *_, **__: SimpleNamespace(returncode=0, stdout='test output', stderr=''))
 
-    with patch('azure_resources.is_debug_enabled', return_value=False):
-        with patch('subprocess.run') as mock_subprocess:
-            mock_subprocess.return_value = Mock(returncode=0, stdout='test output', stderr='')
+    result = az.run('echo test', log_command=True)
 
-            result = az.run('echo test', log_command=True)
+    assert result.success
+    assert result.text == 'test output'
 
-            assert result.success
-            assert result.text == 'test output'
 
-
-def test_cleanup_old_jwt_signing_keys_no_deletions(monkeypatch):
+def test_cleanup_old_jwt_signing_keys_no_deletions(run_dispatcher):
     """Test cleanup when all keys are kept (deleted_count == 0)."""
 
     current_key = 'JwtSigningKey-authx-1234567890'
 
-    suppress_module_functions(monkeypatch, az, ['print_ok', 'print_info', 'print_message'])
-
-    with patch('azure_resources.run') as mock_run:
-        mock_run.side_effect = [
-            Output(True, json.dumps([{'name': current_key}])),
-        ]
+    run_dispatcher.on('nv list', Output(True, f'{current_key}\n'))
 
-        result = az.cleanup_old_jwt_signing_keys('test-apim', 'test-rg', current_key)
+    result = az.cleanup_old_jwt_signing_keys('test-apim', 'test-rg', current_key)
 
-        assert result is True
+    assert result is True
+    assert any('nv list' in c for c in run_dispatcher.calls)
+    assert not any('nv delete' in c for c in run_dispatcher.calls)
 
 
 def test_get_frontdoor_url_no_hostname_in_endpoint(monkeypatch):
     """Test when Front Door endpoint exists but has no hostname."""
 
-    suppress_module_functions(monkeypatch, az, ['print_ok', 'print_warning', 'print_val'])
-
-    with patch('azure_resources.run') as mock_run:
-        mock_run.side_effect = [
-            Output(True, json.dumps([{'name': 'afd-profile'}])),
-            Output(True, json.dumps([{'name': 'endpoint1', 'hostName': None}])),
-        ]
+    patch_run_sequence(
+        monkeypatch,
+        az,
+        [
+            Output(True, _AFD_PROFILE_TSV),
+            Output(True, '\n'),
+        ],
+    )
 
-        result = az.get_frontdoor_url(INFRASTRUCTURE.AFD_APIM_PE, 'test-rg')
+    result = az.get_frontdoor_url(INFRASTRUCTURE.AFD_APIM_PE, 'test-rg')
 
-        assert result is None
+    assert result is None
 
 
 def test_get_frontdoor_url_empty_hostname(monkeypatch):
     """Test when Front Door endpoint has empty hostname string."""
 
-    suppress_module_functions(monkeypatch, az, ['print_ok', 'print_warning', 'print_val'])
-
-    with patch('azure_resources.run') as mock_run:
-        mock_run.side_effect = [
-            Output(True, json.dumps([{'name': 'afd-profile'}])),
-            Output(True, json.dumps([{'name': 'endpoint1', 'hostName': ''}])),
-        ]
+    patch_run_sequence(
+        monkeypatch,
+        az,
+        [
+            Output(True, _AFD_PROFILE_TSV),
+            Output(True, ''),
+        ],
+    )
 
-        result = az.get_frontdoor_url(INFRASTRUCTURE.AFD_APIM_PE, 'test-rg')
+    result = az.get_frontdoor_url(INFRASTRUCTURE.AFD_APIM_PE, 'test-rg')
 
-        assert result is None
+    assert result is None
 
 
-def test_get_appgw_endpoint_no_public_ip_id(monkeypatch):
+def test_get_appgw_endpoint_no_public_ip_id(mock_run):
     """Test when Application Gateway has no public IP ID in frontend config."""
 
-    suppress_module_functions(monkeypatch, az, ['print_ok', 'print_warning'])
+    mock_run.return_value = Output(True, '{"name": "appgw", "hostNames": ["test.example.com"], "publicIpIds": []}')
 
-    with patch('azure_resources.run') as mock_run:
-        mock_run.return_value = Output(
-            True,
-            json.dumps([{'name': 'appgw', 'httpListeners': [{'hostName': 'test.example.com'}], 'frontendIPConfigurations': [{'name': 'config1'}]}]),
-        )
+    hostname, ip = az.get_appgw_endpoint('test-rg')
 
-        hostname, ip = az.get_appgw_endpoint('test-rg')
+    assert hostname == 'test.example.com'
+    assert ip is None
 
-        assert hostname == 'test.example.com'
-        assert ip is None
 
-
-def test_cleanup_old_jwt_signing_keys_deletion_fails(monkeypatch):
+def test_cleanup_old_jwt_signing_keys_deletion_fails(mock_run):
     """Test cleanup when deletion fails (delete_output.success is False)."""
 
     current_key = 'JwtSigningKey-authx-1234567890'
     old_key = 'JwtSigningKey-authx-1111111111'
 
-    suppress_module_functions(monkeypatch, az, ['print_ok', 'print_info', 'print_message'])
-
-    with patch('azure_resources.run') as mock_run:
-        mock_run.side_effect = [
-            # List of keys (TSV format: one name per line)
-            Output(True, f'{current_key}\n{old_key}'),
-            # Delete command fails
-            Output(False, 'Delete failed'),
-        ]
+    mock_run.side_effect = [
+        # List of keys (TSV format: one name per line)
+        Output(True, f'{current_key}\n{old_key}'),
+        # Delete command fails
+        Output(False, 'Delete failed'),
+    ]
 
-        result = az.cleanup_old_jwt_signing_keys('test-apim', 'test-rg', current_key)
+    result = az.cleanup_old_jwt_signing_keys('test-apim', 'test-rg', current_key)
 
-        assert result is True
-        # Verify the run was called twice (list + delete)
-        assert mock_run.call_count == 2
+    assert result is True
+    # Verify the run was called twice (list + delete)
+    assert mock_run.call_count == 2
 
 
-def test_get_frontdoor_url_no_profile_name(monkeypatch):
+def test_get_frontdoor_url_no_profile_name(mock_run):
     """Test when Front Door profile has no name (line 688 False branch)."""
 
-    suppress_module_functions(monkeypatch, az, ['print_ok', 'print_warning'])
-
-    with patch('azure_resources.run') as mock_run:
-        mock_run.return_value = Output(True, json.dumps([{'name': ''}]))
+    mock_run.return_value = Output(True, '\n')
 
-        result = az.get_frontdoor_url(INFRASTRUCTURE.AFD_APIM_PE, 'test-rg')
+    result = az.get_frontdoor_url(INFRASTRUCTURE.AFD_APIM_PE, 'test-rg')
 
-        assert result is None
-        # Only called once since afd_profile_name is empty
-        assert mock_run.call_count == 1
+    assert result is None
+    # Only called once since afd_profile_name is empty
+    assert mock_run.call_count == 1
@@ -9,7 +9,7 @@ from __future__ import annotations
 import logging
 import subprocess
 from types import SimpleNamespace
-from unittest.mock import patch
+from unittest.mock import Mock
 
 # APIM Samples imports
 import azure_resources as az
@@ -36,15 +36,25 @@ def _quiet_console(monkeypatch: pytest.MonkeyPatch) -> None:
     mock_module_functions(monkeypatch, az, ['print_command', 'print_plain', 'print_ok', 'print_error'])
 
 
-def test_run_adds_az_debug_flag_and_keeps_stdout_clean_when_success(_quiet_console: None) -> None:
+@pytest.fixture
+def sp_run(monkeypatch: pytest.MonkeyPatch) -> Mock:
+    """Replace subprocess.run as seen by az.run with a Mock, with DEBUG logging off; tests set return_value / side_effect."""
+
+    fake_subprocess_run = Mock(spec=subprocess.run)
+    monkeypatch.setattr(az, 'is_debug_enabled', lambda: False)
+    monkeypatch.setattr(az.subprocess, 'run', fake_subprocess_run)
+    return fake_subprocess_run
+
+
+def test_run_adds_az_debug_flag_and_keeps_stdout_clean_when_success(_quiet_console: None, sp_run: Mock, monkeypatch: pytest.MonkeyPatch) -> None:
     completed = SimpleNamespace(stdout='{"ok": true}', stderr='DEBUG: noisy stderr', returncode=0)
 
-    with (
-        patch.object(az, 'is_debug_enabled', return_value=True),
-        patch.object(az.subprocess, 'run', return_value=completed) as sp_run,
-        patch.object(az, 'print_plain') as mock_print_plain,
-    ):
-        output = az.run('az group list -o json')
+    monkeypatch.setattr(az, 'is_debug_enabled', lambda: True)
+    sp_run.return_value = completed
+    mock_print_plain = Mock()
+    monkeypatch.setattr(az, 'print_plain', mock_print_plain)
+
+    output = az.run('az group list -o json')
 
     assert output.success is True
     assert output.text == '{"ok": true}'
@@ -61,31 +71,35 @@ def test_run_adds_az_debug_flag_and_keeps_stdout_clean_when_success(_quiet_conso
     assert any(call.kwargs.get('level') == logging.DEBUG for call in mock_print_plain.call_args_list)
 
 
-def test_run_does_not_add_debug_flag_when_not_debug_enabled(_quiet_console: None) -> None:
+def test_run_does_not_add_debug_flag_when_not_debug_enabled(_quiet_console: None, sp_run: Mock) -> None:
     completed = SimpleNamespace(stdout='[]', stderr='', returncode=0)
 
-    with patch.object(az, 'is_debug_enabled', return_value=False), patch.object(az.subprocess, 'run', return_value=completed) as sp_run:
-        output = az.run('az group list -o json')
+    sp_run.return_value = completed
+
+    output = az.run('az group list -o json')
 
     assert output.success is True
     assert output.text == '[]'
     assert '--debug' not in sp_run.call_args.args[0]
 
 
-def test_run_inserts_debug_flag_before_pipe_operator(_quiet_console: None) -> None:
+def test_run_inserts_debug_flag_before_pipe_operator(_quiet_console: None, sp_run: Mock, monkeypatch: pytest.MonkeyPatch) -> None:
     completed = SimpleNamespace(stdout='[]', stderr='debug', returncode=0)
 
-    with patch.object(az, 'is_debug_enabled', return_value=True), patch.object(az.subprocess, 'run', return_value=completed) as sp_run:
-        az.run('az group list -o json | jq .')
+    monkeypatch.setattr(az, 'is_debug_enabled', lambda: True)
+    sp_run.return_value = completed
+
+    az.run('az group list -o json | jq .')
 
     assert sp_run.call_args.args[0] == 'az group list -o json --debug | jq .'
 
 
-def test_run_combines_stdout_and_stderr_on_failure(_quiet_console: None) -> None:
+def test_run_combines_stdout_and_stderr_on_failure(_quiet_console: None, sp_run: Mock) -> None:
     completed = SimpleNamespace(stdout='partial', stderr='ERROR: failed', returncode=1)
 
-    with patch.object(az, 'is_debug_enabled', return_value=False), patch.object(az.subprocess, 'run', return_value=completed):
-        output = az.run('az group list -o json', error_message='failed')
+    sp_run.return_value = completed
+
+    output = az.run('az group list -o json', error_message='failed')
 
     assert output.success is False
     assert 'partial' in output.text
@@ -585,7 +599,7 @@ def test_get_group_deployment_failure_summary_uses_fetched_operations(monkeypatc
     assert 'Failed deployment operations (1):' in summary
 
 
-def test_run_failure_appends_failed_group_deployment_operations(_quiet_console: None) -> None:
+def test_run_failure_appends_failed_group_deployment_operations(_quiet_console: None, sp_run: Mock, monkeypatch: pytest.MonkeyPatch) -> None:
     failed_deployment = SimpleNamespace(
         stdout='',
         stderr='ERROR: At least one resource deployment operation failed. Please list deployment operations for details.',
@@ -609,16 +623,15 @@ def test_run_failure_appends_failed_group_deployment_operations(_quiet_console:
             },
         }
     ]
-    with (
-        patch.object(az, 'is_debug_enabled', return_value=False),
-        patch.object(az.subprocess, 'run', return_value=failed_deployment),
-        patch.object(az, '_fetch_group_deployment_operations', return_value=deployment_operations),
-        patch.object(az, 'print_error') as mock_print_error,
-    ):
-        output = az.run(
-            'az deployment group create --name appgw-apim --resource-group apim-infra-appgw-apim-1 --template-file "main.bicep"',
-            error_message='Deployment failed',
-        )
+    sp_run.return_value = failed_deployment
+    monkeypatch.setattr(az, '_fetch_group_deployment_operations', Mock(return_value=deployment_operations))
+    mock_print_error = Mock()
+    monkeypatch.setattr(az, 'print_error', mock_print_error)
+
+    output = az.run(
+        'az deployment group create --name appgw-apim --resource-group apim-infra-appgw-apim-1 --template-file "main.bicep"',
+        error_message='Deployment failed',
+    )
 
     assert output.success is False
     rendered_detail = mock_print_error.call_args.args[1]
@@ -628,14 +641,15 @@ def test_run_failure_appends_failed_group_deployment_operations(_quiet_console:
     assert 'ApplicationGatewaySubnetCannotHaveDelegations' in rendered_detail
 
 
-def test_run_uses_az_cli_lock_only_for_az_commands(_quiet_console: None, monkeypatch: pytest.MonkeyPatch) -> None:
+def test_run_uses_az_cli_lock_only_for_az_commands(_quiet_console: None, monkeypatch: pytest.MonkeyPatch, sp_run: Mock) -> None:
     fake_lock = _FakeLock()
     monkeypatch.setattr(az, '_AZ_CLI_LOCK', fake_lock)
 
     completed = SimpleNamespace(stdout='ok', stderr='', returncode=0)
 
-    with patch.object(az, 'is_debug_enabled', return_value=False), patch.object(az.subprocess, 'run', return_value=completed):
-        az.run('az group list')
+    sp_run.return_value = completed
+
+    az.run('az group list')
 
     assert fake_lock.entered == 1
     assert fake_lock.exited == 1
@@ -644,8 +658,7 @@ def test_run_uses_az_cli_lock_only_for_az_commands(_quiet_console: None, monkeyp
     fake_lock.entered = 0
     fake_lock.exited = 0
 
-    with patch.object(az, 'is_debug_enabled', return_value=False), patch.object(az.subprocess, 'run', return_value=completed):
-        az.run('echo hello')
+    az.run('echo hello')
 
     assert not fake_lock.entered
     assert not fake_lock.exited
@@ -656,48 +669,46 @@ def test_run_uses_az_cli_lock_only_for_az_commands(_quiet_console: None, monkeyp
 # ------------------------------
 
 
-def test_run_passes_default_timeout_to_subprocess(_quiet_console: None) -> None:
+def test_run_passes_default_timeout_to_subprocess(_quiet_console: None, sp_run: Mock) -> None:
     """Default timeout of 240 seconds is forwarded to subprocess.run."""
     completed = SimpleNamespace(stdout='ok', stderr='', returncode=0)
 
-    with patch.object(az, 'is_debug_enabled', return_value=False), patch.object(az.subprocess, 'run', return_value=completed) as sp_run:
-        az.run('echo hello')
+    sp_run.return_value = completed
+
+    az.run('echo hello')
 
     assert sp_run.call_args.kwargs['timeout'] == 240
 
 
-def test_run_passes_custom_timeout_to_subprocess(_quiet_console: None) -> None:
+def test_run_passes_custom_timeout_to_subprocess(_quiet_console: None, sp_run: Mock) -> None:
     """A caller-provided timeout overrides the default."""
     completed = SimpleNamespace(stdout='ok', stderr='', returncode=0)
 
-    with patch.object(az, 'is_debug_enabled', return_value=False), patch.object(az.subprocess, 'run', return_value=completed) as sp_run:
-        az.run('echo hello', timeout=60)
+    sp_run.return_value = completed
+
+    az.run('echo hello', timeout=60)
 
     assert sp_run.call_args.kwargs['timeout'] == 60
 
 
-def test_run_timeout_expired_returns_failure(_quiet_console: None) -> None:
+def test_run_timeout_expired_returns_failure(_quiet_console: None, sp_run: Mock) -> None:
     """When the command times out, run() returns a failed Output."""
-    with (
-        patch.object(az, 'is_debug_enabled', return_value=False),
-        patch.object(az.subprocess, 'run', side_effect=subprocess.TimeoutExpired('cmd', 10)),
-    ):
-        output = az.run('az group list', timeout=10, retries=0)
+    sp_run.side_effect = subprocess.TimeoutExpired('cmd', 10)
+
+    output = az.run('az group list', timeout=10, retries=0)
 
     assert output.success is False
     assert 'timed out' in output.text
 
 
-def test_run_timeout_expired_with_az_lock(_quiet_console: None, monkeypatch: pytest.MonkeyPatch) -> None:
+def test_run_timeout_expired_with_az_lock(_quiet_console: None, monkeypatch: pytest.MonkeyPatch, sp_run: Mock) -> None:
     """Timeout while holding the az CLI lock still marks the result as failed."""
     fake_lock = _FakeLock()
     monkeypatch.setattr(az, '_AZ_CLI_LOCK', fake_lock)
 
-    with (
-        patch.object(az, 'is_debug_enabled', return_value=False),
-        patch.object(az.subprocess, 'run', side_effect=subprocess.TimeoutExpired('cmd', 10)),
-    ):
-        output = az.run('az group list', timeout=10, retries=0)
+    sp_run.side_effect = subprocess.TimeoutExpired('cmd', 10)
+
+    output = az.run('az group list', timeout=10, retries=0)
 
     assert output.success is False
     assert 'timed out' in output.text
@@ -710,122 +721,237 @@ def test_run_timeout_expired_with_az_lock(_quiet_console: None, monkeypatch: pyt
 # ------------------------------
 
 
-def test_run_default_retries_retries_once_on_failure(_quiet_console: None) -> None:
+def test_run_default_retries_retries_once_on_failure(_quiet_console: None, sp_run: Mock, monkeypatch: pytest.MonkeyPatch) -> None:
     """With default retries=1, subprocess.run is called twice on failure."""
     failed = SimpleNamespace(stdout='', stderr='error', returncode=1)
 
-    with (
-        patch.object(az, 'is_debug_enabled', return_value=False),
-        patch.object(az.subprocess, 'run', return_value=failed) as sp_run,
-        patch.object(az, 'print_warning'),
-    ):
-        output = az.run('echo fail')
+    sp_run.return_value = failed
+    monkeypatch.setattr(az, 'print_warning', Mock())
+
+    output = az.run('echo fail')
 
     assert output.success is False
     assert sp_run.call_count == 2
 
 
-def test_run_retries_zero_no_retry_on_failure(_quiet_console: None) -> None:
+def test_run_retries_zero_no_retry_on_failure(_quiet_console: None, sp_run: Mock) -> None:
     """With retries=0, subprocess.run is called only once."""
     failed = SimpleNamespace(stdout='', stderr='error', returncode=1)
 
-    with (
-        patch.object(az, 'is_debug_enabled', return_value=False),
-        patch.object(az.subprocess, 'run', return_value=failed) as sp_run,
-    ):
-        output = az.run('echo fail', retries=0)
+    sp_run.return_value = failed
+
+    output = az.run('echo fail', retries=0)
 
     assert output.success is False
     assert sp_run.call_count == 1
 
 
-def test_run_retries_custom_value(_quiet_console: None) -> None:
+def test_run_retries_custom_value(_quiet_console: None, sp_run: Mock, monkeypatch: pytest.MonkeyPatch) -> None:
     """With retries=3, subprocess.run is called four times on persistent failure."""
     failed = SimpleNamespace(stdout='', stderr='error', returncode=1)
 
-    with (
-        patch.object(az, 'is_debug_enabled', return_value=False),
-        patch.object(az.subprocess, 'run', return_value=failed) as sp_run,
-        patch.object(az, 'print_warning'),
-    ):
-        output = az.run('echo fail', retries=3)
+    sp_run.return_value = failed
+    monkeypatch.setattr(az, 'print_warning', Mock())
+
+    output = az.run('echo fail', retries=3)
 
     assert output.success is False
     assert sp_run.call_count == 4
 
 
-def test_run_retry_succeeds_on_second_attempt(_quiet_console: None) -> None:
+def test_run_retry_succeeds_on_second_attempt(_quiet_console: None, sp_run: Mock, monkeypatch: pytest.MonkeyPatch) -> None:
     """When the first attempt fails and the retry succeeds, run() returns success."""
     failed = SimpleNamespace(stdout='', stderr='error', returncode=1)
     succeeded = SimpleNamespace(stdout='ok', stderr='', returncode=0)
 
-    with (
-        patch.object(az, 'is_debug_enabled', return_value=False),
-        patch.object(az.subprocess, 'run', side_effect=[failed, succeeded]) as sp_run,
-        patch.object(az, 'print_warning'),
-    ):
-        output = az.run('echo hello')
+    sp_run.side_effect = [failed, succeeded]
+    monkeypatch.setattr(az, 'print_warning', Mock())
+
+    output = az.run('echo hello')
 
     assert output.success is True
     assert output.text == 'ok'
     assert sp_run.call_count == 2
 
 
-def test_run_no_retry_on_success(_quiet_console: None) -> None:
+def test_run_no_retry_on_success(_quiet_console: None, sp_run: Mock) -> None:
     """When the first attempt succeeds, no retry is attempted."""
     completed = SimpleNamespace(stdout='ok', stderr='', returncode=0)
 
-    with (
-        patch.object(az, 'is_debug_enabled', return_value=False),
-        patch.object(az.subprocess, 'run', return_value=completed) as sp_run,
-    ):
-        output = az.run('echo hello', retries=3)
+    sp_run.return_value = completed
+
+    output = az.run('echo hello', retries=3)
 
     assert output.success is True
     assert sp_run.call_count == 1
 
 
-def test_run_retry_after_timeout_succeeds(_quiet_console: None) -> None:
+def test_run_retry_after_timeout_succeeds(_quiet_console: None, sp_run: Mock, monkeypatch: pytest.MonkeyPatch) -> None:
     """A timeout on the first attempt followed by success on retry."""
     succeeded = SimpleNamespace(stdout='ok', stderr='', returncode=0)
 
-    with (
-        patch.object(az, 'is_debug_enabled', return_value=False),
-        patch.object(az.subprocess, 'run', side_effect=[subprocess.TimeoutExpired('cmd', 10), succeeded]) as sp_run,
-        patch.object(az, 'print_warning'),
-    ):
-        output = az.run('echo hello', timeout=10)
+    sp_run.side_effect = [subprocess.TimeoutExpired('cmd', 10), succeeded]
+    monkeypatch.setattr(az, 'print_warning', Mock())
+
+    output = az.run('echo hello', timeout=10)
 
     assert output.success is True
     assert output.text == 'ok'
     assert sp_run.call_count == 2
 
 
-def test_run_retry_prints_warning_on_failure(_quiet_console: None) -> None:
+def test_run_retry_prints_warning_on_failure(_quiet_console: None, sp_run: Mock, monkeypatch: pytest.MonkeyPatch) -> None:
     """A warning is printed between retry attempts."""
     failed = SimpleNamespace(stdout='', stderr='error', returncode=1)
 
-    with (
-        patch.object(az, 'is_debug_enabled', return_value=False),
-        patch.object(az.subprocess, 'run', return_value=failed),
-        patch.object(az, 'print_warning') as mock_warn,
-    ):
-        az.run('echo fail', retries=2)
+    sp_run.return_value = failed
+    mock_warn = Mock()
+    monkeypatch.setattr(az, 'print_warning', mock_warn)
+
+    az.run('echo fail', retries=2)
 
     assert mock_warn.call_count == 2
     assert 'attempt 1/3' in mock_warn.call_args_list[0].args[0]
     assert 'attempt 2/3' in mock_warn.call_args_list[1].args[0]
 
 
-def test_run_negative_retries_treated_as_zero(_quiet_console: None) -> None:
+def test_run_negative_retries_treated_as_zero(_quiet_console: None, sp_run: Mock) -> None:
     """Negative retries value is clamped to zero (single attempt)."""
     failed = SimpleNamespace(stdout='', stderr='error', returncode=1)
 
-    with (
-        patch.object(az, 'is_debug_enabled', return_value=False),
-        patch.object(az.subprocess, 'run', return_value=failed) as sp_run,
-    ):
-        output = az.run('echo fail', retries=-5)
+    sp_run.return_value = failed
+
+    output = az.run('echo fail', retries=-5)
 
     assert output.success is False
     assert sp_run.call_count == 1
+
+
+def test_run_caches_successful_read_only_queries(_quiet_console: None, sp_run: Mock) -> None:
+    """Repeated read-only queries such as `az account show` hit the CLI once within the cache TTL."""
+    completed = SimpleNamespace(stdout='{"id": "sub"}', stderr='', returncode=0)
+
+    sp_run.return_value = completed
+
+    first = az.run('az account show -o json')
+    second = az.run('az account show -o json')
+
+    assert second is first
+    assert sp_run.call_count == 1
+
+
+def test_run_cache_entries_expire_after_ttl(_quiet_console: None, sp_run: Mock, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Changes made outside this process (e.g. `az account set` in a terminal) are picked up once the TTL passes."""
+    completed = SimpleNamespace(stdout='sub-1', stderr='', returncode=0)
+    now = [1000.0]
+
+    sp_run.return_value = completed
+    monkeypatch.setattr(az.time, 'monotonic', lambda: now[0])
+
+    az.run('az account show --query id -o tsv')
+    now[0] += az._AZ_CACHE_TTL_SECONDS - 1
+    az.run('az account show --query id -o tsv')
+
+    assert sp_run.call_count == 1
+
+    now[0] += 1
+    az.run('az account show --query id -o tsv')
+
+    assert sp_run.call_count == 2
+
+
+def test_run_does_not_cache_failed_queries(_quiet_console: None, sp_run: Mock) -> None:
+    failed = SimpleNamespace(stdout='', stderr='Please run az login', returncode=1)
+
+    sp_run.return_value = failed
+
+    az.run('az account show', retries=0)
+    az.run('az account show', retries=0)
+
+    assert sp_run.call_count == 2
+
+
+def test_run_does_not_cache_mutating_commands(_quiet_console: None, sp_run: Mock) -> None:
+    completed = SimpleNamespace(stdout='[]', stderr='', returncode=0)
+
+    sp_run.return_value = completed
+
+    az.run('az group list -o json')
+    az.run('az group list -o json')
+
+    assert sp_run.call_count == 2
+
+
+def test_run_invalidating_command_clears_cache(_quiet_console: None, sp_run: Mock) -> None:
+    completed = SimpleNamespace(stdout='{"id": "sub"}', stderr='', returncode=0)
+
+    sp_run.return_value = completed
+
+    az.run('az account show')
+    az.run('az account set --subscription other')
+    az.run('az account show')
+
+    assert sp_run.call_count == 3
+
+
+def test_run_cache_hit_reports_cached_command_and_ok_message(_quiet_console: None, sp_run: Mock, monkeypatch: pytest.MonkeyPatch) -> None:
+    completed = SimpleNamespace(stdout='2.70.0', stderr='', returncode=0)
+
+    sp_run.return_value = completed
+
+    az.run('az version')
+
+    monkeypatch.setattr(az, 'is_debug_enabled', lambda: True)
+    mock_print_command = Mock()
+    monkeypatch.setattr(az, 'print_command', mock_print_command)
+    mock_print_ok = Mock()
+    monkeypatch.setattr(az, 'print_ok', mock_print_ok)
+
+    # The injected --debug flag is part of the cache key, so the first debug-mode call misses.
+    az.run('az version')
+    az.run('az version', ok_message='CLI found')
+
+    assert sp_run.call_count == 2
+    assert mock_print_command.call_args.args[0].endswith('(cached)')
+    mock_print_ok.assert_called_once_with('CLI found')
+
+
+@pytest.mark.parametrize(
+    ('kwargs', 'expected_logged'),
+    [
+        ({}, False),
+        ({'ok_message': 'CLI found'}, True),
+        ({'error_message': 'CLI missing'}, True),
+        ({'ok_message': 'CLI found', 'log_command': False}, False),
+        ({'log_command': True}, True),
+    ],
+)
+def test_run_cache_hit_applies_log_command_rule(
+    _quiet_console: None, sp_run: Mock, monkeypatch: pytest.MonkeyPatch, kwargs: dict, expected_logged: bool
+) -> None:
+    sp_run.return_value = SimpleNamespace(stdout='2.70.0', stderr='', returncode=0)
+
+    az.run('az version', log_command=False)
+
+    mock_print_command = Mock()
+    monkeypatch.setattr(az, 'print_command', mock_print_command)
+
+    az.run('az version', **kwargs)
+
+    assert sp_run.call_count == 1
+    if expected_logged:
+        mock_print_command.assert_called_once_with('az version (cached)')
+    else:
+        mock_print_command.assert_not_called()
+
+
+def test_load_azure_roles_reads_file_once(tmp_path) -> None:
+    roles_file = tmp_path / 'azure-roles.json'
+    roles_file.write_text('{"Reader": "guid-1"}', encoding='utf-8')
+
+    assert az._load_azure_roles(str(roles_file)) == {'Reader': 'guid-1'}
+    roles_file.write_text('{"Reader": "guid-2"}', encoding='utf-8')
+    assert az._load_azure_roles(str(roles_file)) == {'Reader': 'guid-1'}
+
+    az._cache_clear()
+    assert az._load_azure_roles(str(roles_file)) == {'Reader': 'guid-2'}
@@ -6,6 +6,7 @@ import io
 import logging
 import builtins
 from collections.abc import Callable
+from typing import Any
 from unittest.mock import Mock, MagicMock, mock_open, patch
 import json as json_module
 
@@ -143,6 +144,12 @@ def mock_popen(monkeypatch, *, stdout_lines: list[str], returncode: int = 0) ->
     monkeypatch.setattr('subprocess.Popen', MockProcess)
 
 
+def patch_run_sequence(monkeypatch, module, outputs) -> None:
+    """Make ``module.run`` return ``outputs`` in order from a plain iterator, without Mock call tracking."""
+    responses = iter(outputs)
+    monkeypatch.setattr(module, 'run', lambda *_args, **_kwargs: next(responses))
+
+
 def patch_os_paths(
     monkeypatch, *, cwd: str = '/test/dir', exists: bool | Callable[[str], bool] = True, basename: str | Callable[[str], str] = 'test-dir'
 ) -> None:
@@ -154,10 +161,11 @@ def patch_os_paths(
     else:
         monkeypatch.setattr('os.path.exists', MagicMock(return_value=exists))
 
+    # os.path.basename is shared with stdlib logging internals, so patch it with a plain function rather than a Mock
     if callable(basename):
         monkeypatch.setattr('os.path.basename', basename)
     else:
-        monkeypatch.setattr('os.path.basename', MagicMock(return_value=basename))
+        monkeypatch.setattr('os.path.basename', lambda _path: basename)
 
 
 def patch_create_bicep_deployment_group_dependencies(
@@ -194,14 +202,14 @@ def patch_create_bicep_deployment_group_dependencies(
 # ------------------------------
 
 
-def create_mock_output(success: bool = True, text: str = '', json_data: dict | None = None) -> Output:
+def create_mock_output(success: bool = True, text: str = '', json_data: Any = None) -> Output:
     """
     Factory for creating consistent mock Azure CLI Output objects.
 
     Args:
         success: Whether the command succeeded
         text: Text output from command
-        json_data: JSON data from command
+        json_data: JSON data from command (dict or list)
 
     Returns:
         Output object configured with provided values
@@ -209,9 +217,38 @@ def create_mock_output(success: bool = True, text: str = '', json_data: dict | N
     output = Output(success, text)
     if json_data is not None:
         output.json_data = json_data
+        output.is_json = True
     return output
 
 
+class RunDispatcher:
+    """
+    Callable stand-in for azure_resources.run that answers commands from a route table.
+
+    Routes are (substring, Output) pairs checked in registration order; the first substring found in the
+    command wins. Unmatched commands return the default Output. Every command is recorded in ``calls``.
+    """
+
+    def __init__(self, default: Output | None = None):
+        self.routes: list[tuple[str, Output]] = []
+        self.calls: list[str] = []
+        self.default = default if default is not None else Output(False, 'unexpected command')
+
+    def on(self, substring: str, output: Output) -> 'RunDispatcher':
+        """Answer commands containing ``substring`` with ``output``. Returns self for chaining."""
+        self.routes.append((substring, output))
+        return self
+
+    def __call__(self, cmd: str, *args, **kwargs) -> Output:
+        self.calls.append(cmd)
+
+        for substring, output in self.routes:
+            if substring in cmd:
+                return output
+
+        return self.default
+
+
 def create_mock_az_module(
     rg_exists: bool = True,
     rg_name: str = 'rg-test-infrastructure-01',